@@ -5,11 +5,11 @@ Fixed action format conversion issues
 Uses P control, keyboard only changes target joint angles
 """
 
-import time
 import logging
 import traceback
 import constants
 from pathlib import Path
+from ArmController import ArmController
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,248 +26,21 @@ JOINT_CALIBRATION = [
     ['gripper', 0.0, 1.0],           # Joint6: zero position offset, scale factor
 ]
 
-def apply_joint_calibration(joint_name, raw_position):
-    """
-    Apply joint calibration coefficients
-    
-    Args:
-        joint_name: Joint name
-        raw_position: Raw position value
-    
-    Returns:
-        calibrated_position: Calibrated position value
-    """
-    for joint_cal in JOINT_CALIBRATION:
-        if joint_cal[0] == joint_name:
-            offset = joint_cal[1]  # Zero position offset
-            scale = joint_cal[2]   # Scale factor
-            calibrated_position = (raw_position - offset) * scale
-            return calibrated_position
-    return raw_position  # If calibration coefficients not found, return raw value
-
-
-def move_to_zero_position(robot, duration=3.0, kp=0.5):
-    """
-    Use P control to slowly move robot to zero position
-    
-    Args:
-        robot: Robot instance
-        duration: Time required to move to zero position (seconds)
-        kp: Proportional gain
-    """
-    print("Using P control to slowly move robot to zero position...")
-    
-    # Get current robot state
-    current_obs = robot.get_observation()
-    
-    # Extract current joint positions
-    current_positions = {}
-    for key, value in current_obs.items():
-        if key.endswith('.pos'):
-            motor_name = key.removesuffix('.pos')
-            current_positions[motor_name] = value
-    
-    # Zero position targets
-    zero_positions = {
-        'shoulder_pan': 0.0,
-        'shoulder_lift': 0.0,
-        'elbow_flex': 0.0,
-        'wrist_flex': 0.0,
-        'wrist_roll': 0.0,
-        'gripper': 0.0
-    }
-    
-    # Calculate control steps
-    control_freq = 50  # 50Hz control frequency
-    total_steps = int(duration * control_freq)
-    step_time = 1.0 / control_freq
-    
-    print(f"Will move to zero position in {duration} seconds using P control, control frequency: {control_freq}Hz, proportional gain: {kp}")
-    
-    for step in range(total_steps):
-        # Get current robot state
-        current_obs = robot.get_observation()
-        current_positions = {}
-        for key, value in current_obs.items():
-            if key.endswith('.pos'):
-                motor_name = key.removesuffix('.pos')
-                # Apply calibration coefficients
-                calibrated_value = apply_joint_calibration(motor_name, value)
-                current_positions[motor_name] = calibrated_value
-        
-        # P control calculation
-        robot_action = {}
-        for joint_name, target_pos in zero_positions.items():
-            if joint_name in current_positions:
-                current_pos = current_positions[joint_name]
-                error = target_pos - current_pos
-                
-                # P control: output = Kp * error
-                control_output = kp * error
-                
-                # Convert control output to position command
-                new_position = current_pos + control_output
-                robot_action[f"{joint_name}.pos"] = new_position
-        
-        # Send action to robot
-        if robot_action:
-            robot.send_action(robot_action)
-        
-        # Display progress
-        if step % (control_freq // 2) == 0:  # Display progress every 0.5 seconds
-            progress = (step / total_steps) * 100
-            print(f"Moving to zero position progress: {progress:.1f}%")
-        
-        time.sleep(step_time)
-    
-    print("Robot has moved to zero position")
-
-def return_to_start_position(robot, start_positions, kp=0.5, control_freq=50):
-    """
-    Use P control to return to start position
-    
-    Args:
-        robot: Robot instance
-        start_positions: Start joint positions dictionary
-        kp: Proportional gain
-        control_freq: Control frequency (Hz)
-    """
-    print("Returning to start position...")
-    
-    control_period = 1.0 / control_freq
-    max_steps = int(5.0 * control_freq)  # Maximum 5 seconds
-    
-    for step in range(max_steps):
-        # Get current robot state
-        current_obs = robot.get_observation()
-        current_positions = {}
-        for key, value in current_obs.items():
-            if key.endswith('.pos'):
-                motor_name = key.removesuffix('.pos')
-                current_positions[motor_name] = value  # Don't apply calibration coefficients
-        
-        # P control calculation
-        robot_action = {}
-        total_error = 0
-        for joint_name, target_pos in start_positions.items():
-            if joint_name in current_positions:
-                current_pos = current_positions[joint_name]
-                error = target_pos - current_pos
-                total_error += abs(error)
-                
-                # P control: output = Kp * error
-                control_output = kp * error
-                
-                # Convert control output to position command
-                new_position = current_pos + control_output
-                robot_action[f"{joint_name}.pos"] = new_position
-        
-        # Send action to robot
-        if robot_action:
-            robot.send_action(robot_action)
-        
-        # Check if start position is reached
-        if total_error < 2.0:  # If total error is less than 2 degrees, consider reached
-            print("Returned to start position")
-            break
-        
-        time.sleep(control_period)
-    
-    print("Return to start position completed")
-
-def p_control_loop(robot, keyboard, target_positions, start_positions, kp=0.5, control_freq=50):
-    """
-    P control loop
-    
-    Args:
-        robot: Robot instance
-        keyboard: Keyboard instance
-        target_positions: Target joint positions dictionary
-        start_positions: Start joint positions dictionary
-        kp: Proportional gain
-        control_freq: Control frequency (Hz)
-    """
-    control_period = 1.0 / control_freq
-    
-    print(f"Starting P control loop, control frequency: {control_freq}Hz, proportional gain: {kp}")
-    
-    while True:
-        try:
-            # Get keyboard input
-            keyboard_action = keyboard.get_action()
-            
-            if keyboard_action:
-                # Process keyboard input, update target positions
-                for key, value in keyboard_action.items():
-                    if key == 'x':
-                        # Exit program, first return to start position
-                        print("Exit command detected, returning to start position...")
-                        return_to_start_position(robot, start_positions, 0.2, control_freq)
-                        return
-                    
-                    # Joint control mapping
-                    joint_controls = {
-                        'q': ('shoulder_pan', -1),    # Joint1 decrease
-                        'a': ('shoulder_pan', 1),     # Joint1 increase
-                        'w': ('shoulder_lift', -1),   # Joint2 decrease
-                        's': ('shoulder_lift', 1),    # Joint2 increase
-                        'e': ('elbow_flex', -1),      # Joint3 decrease
-                        'd': ('elbow_flex', 1),       # Joint3 increase
-                        'r': ('wrist_flex', -1),      # Joint4 decrease
-                        'f': ('wrist_flex', 1),       # Joint4 increase
-                        't': ('wrist_roll', -1),      # Joint5 decrease
-                        'g': ('wrist_roll', 1),       # Joint5 increase
-                        'y': ('gripper', -1),         # Joint6 decrease
-                        'h': ('gripper', 1),          # Joint6 increase
-                    }
-                    
-                    if key in joint_controls:
-                        joint_name, delta = joint_controls[key]
-                        if joint_name in target_positions:
-                            current_target = target_positions[joint_name]
-                            new_target = int(current_target + delta)
-                            target_positions[joint_name] = new_target
-                            print(f"Updated target position {joint_name}: {current_target} -> {new_target}")
-            
-            # Get current robot state
-            current_obs = robot.get_observation()
-            
-            # Extract current joint positions
-            current_positions = {}
-            for key, value in current_obs.items():
-                if key.endswith('.pos'):
-                    motor_name = key.removesuffix('.pos')
-                    # Apply calibration coefficients
-                    calibrated_value = apply_joint_calibration(motor_name, value)
-                    current_positions[motor_name] = calibrated_value
-            
-            # P control calculation
-            robot_action = {}
-            for joint_name, target_pos in target_positions.items():
-                if joint_name in current_positions:
-                    current_pos = current_positions[joint_name]
-                    error = target_pos - current_pos
-                    
-                    # P control: output = Kp * error
-                    control_output = kp * error
-                    
-                    # Convert control output to position command
-                    new_position = current_pos + control_output
-                    robot_action[f"{joint_name}.pos"] = new_position
-            
-            # Send action to robot
-            if robot_action:
-                robot.send_action(robot_action)
-            
-            time.sleep(control_period)
-            
-        except KeyboardInterrupt:
-            print("User interrupted program")
-            break
-        except Exception as e:
-            print(f"P control loop error: {e}")
-            traceback.print_exc()
-            break
+# Joint control mapping: key -> (joint, delta in degrees)
+JOINT_CONTROLS = {
+    'q': ('shoulder_pan', -1),    # Joint1 decrease
+    'a': ('shoulder_pan', 1),     # Joint1 increase
+    'w': ('shoulder_lift', -1),   # Joint2 decrease
+    's': ('shoulder_lift', 1),    # Joint2 increase
+    'e': ('elbow_flex', -1),      # Joint3 decrease
+    'd': ('elbow_flex', 1),       # Joint3 increase
+    'r': ('wrist_flex', -1),      # Joint4 decrease
+    'f': ('wrist_flex', 1),       # Joint4 increase
+    't': ('wrist_roll', -1),      # Joint5 decrease
+    'g': ('wrist_roll', 1),       # Joint5 increase
+    'y': ('gripper', -1),         # Joint6 decrease
+    'h': ('gripper', 1),          # Joint6 increase
+}
 
 def main():
     """Main function"""
@@ -312,32 +85,19 @@ def main():
             else:
                 print("Please enter y or n")
         
+        # Positions are read calibrated and commands sent back raw
+        controller = ArmController({'arm': robot}, JOINT_CALIBRATION, joint_controls={'arm': JOINT_CONTROLS})
+        
         # Read starting joint angles
         print("Reading starting joint angles...")
-        start_obs = robot.get_observation()
-        start_positions = {}
-        for key, value in start_obs.items():
-            if key.endswith('.pos'):
-                motor_name = key.removesuffix('.pos')
-                start_positions[motor_name] = int(value)  # Don't apply calibration coefficients
+        start_positions = controller.read_start_positions()  # Don't apply calibration coefficients
         
         print("Starting joint angles:")
-        for joint_name, position in start_positions.items():
-            print(f"  {joint_name}: {position}°")
-        
-        # Move to zero position
-        move_to_zero_position(robot, duration=3.0)
-        
-        # Initialize target positions to current positions (integers)
-        target_positions = {
-        'shoulder_pan': 0.0,
-        'shoulder_lift': 0.0,
-        'elbow_flex': 0.0,
-        'wrist_flex': 0.0,
-        'wrist_roll': 0.0,
-        'gripper': 0.0
-          }
+        for joint_name, position in zip(controller.joints, start_positions[0]):
+            print(f"  {joint_name}: {position:.0f}°")
         
+        # Move to zero position, then hold zero as the target
+        controller.move_to_zero_position(duration=3.0)
         
         print("Keyboard control instructions:")
         print("- Q/A: Joint1 (shoulder_pan) decrease/increase")
@@ -352,7 +112,8 @@ def main():
         print("Note: Robot will continuously move to target position")
         
         # Start P control loop
-        p_control_loop(robot, keyboard, target_positions, start_positions, kp=0.5, control_freq=50)
+        controller.p_control_loop(keyboard, kp=0.5)
+        controller.close()
         
         # Disconnect
         robot.disconnect()
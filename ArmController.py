@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from constants import ELBOW_FLEX, SHOULDER_LIFT, WRIST_FLEX
+from JointCalibration import JointCalibration
+from kinematics import forward_kinematics_array, inverse_kinematics_array
+from RobotPosition import POS_SUFFIX, JointSchema, RobotPosition
+from utils import get_custom_logger, RateKeeper
+
+if TYPE_CHECKING:
+    from EvaRobot import EvaRobot
+    from trajectory import JointTrajectory
+
+logger = get_custom_logger()
+
+# Kinds of key bindings
+JOINT = 0
+XY = 1
+PITCH = 2
+
+XY_COORDS = {'x': 0, 'y': 1}
+
+
+# Serial port of a robot's bus, robots without one get a port of their own
+def port_of(robot):
+    port = getattr(getattr(robot, "config", None), "port", None)
+    if port is None:
+        port = getattr(getattr(robot, "bus", None), "port", None)
+    return id(robot) if port is None else port
+
+
+# SO100Follower interface: get_observation() / send_action() with
+# {"joint.pos": raw} dicts, e.g. SimulatedFollower
+class FollowerArm:
+
+    def __init__(self, robot, joints: tuple[str]):
+        self.robot = robot
+        self.port = port_of(robot)
+        self.keys = tuple(f"{joint}{POS_SUFFIX}" for joint in joints)
+
+    def read(self, out: np.ndarray):
+        observation = self.robot.get_observation()
+        out[:] = [observation[key] for key in self.keys]
+
+    def write(self, values: np.ndarray):
+        self.robot.send_action(dict(zip(self.keys, values.tolist())))
+
+
+# EvaRobot interface, positions already carry the robot's joint calibration
+class EvaRobotArm:
+
+    def __init__(self, robot: EvaRobot, joints: tuple[str]):
+        self.robot = robot
+        self.port = port_of(robot)
+        self.schema = JointSchema.from_motors(joints)
+
+    def read(self, out: np.ndarray):
+        position = self.robot.get_current_position()
+        out[:] = position.values[position.schema.take(self.schema)]
+
+    def write(self, values: np.ndarray):
+        self.robot.move_to_position(
+            RobotPosition.from_values(self.schema, values))
+
+
+def make_arm(robot, joints: tuple[str]):
+    if hasattr(robot, "get_observation"):
+        return FollowerArm(robot, joints)
+    return EvaRobotArm(robot, joints)
+
+
+# P control of any number of arms with the keyboard, shared by the scripts.
+# Positions of all arms are kept in preallocated (arms, joints) arrays, so
+# every tick is one vectorized update however many arms are driven; only the
+# bus reads and writes are per arm. Key bindings are data, given per arm:
+#   joint_controls {arm: {key: (joint, delta)}}, joint targets in degrees
+#   xy_controls {arm: {key: ('x' | 'y', delta)}}, end effector in meters,
+#       solved into shoulder_lift and elbow_flex
+#   pitch_controls {arm: {key: delta}}, wrist_flex pitch in degrees
+# Arms with xy or pitch bindings keep the wrist level:
+#   wrist_flex = -shoulder_lift - elbow_flex + pitch
+class ArmController:
+    names: tuple[str]
+    joints: tuple[str]
+    calibration: JointCalibration
+    bindings: dict[str, tuple[int, int, int, float]]
+    raw: np.ndarray
+    current: np.ndarray
+    target: np.ndarray
+    command: np.ndarray
+    start: np.ndarray
+    xy: np.ndarray
+    pitch: np.ndarray
+
+    # arms maps names to SO100Follower-like robots or EvaRobots.
+    # calibration holds [joint, offset, scale] rows like JOINT_CALIBRATION,
+    # joints defaults to its joint order. It applies to the followers only,
+    # EvaRobots use the joint_calibration of their config.
+    # With parallel_io, arms on different serial ports are read and written
+    # at the same time, so a tick costs about one port's round-trip.
+    def __init__(self,
+                 arms: Mapping,
+                 calibration: Sequence = (),
+                 joints: Sequence[str] = None,
+                 joint_controls: Mapping = None,
+                 xy_controls: Mapping = None,
+                 pitch_controls: Mapping = None,
+                 control_freq: float = 50,
+                 exit_key: str = 'x',
+                 parallel_io: bool = True):
+        self.calibration = JointCalibration(
+            calibration, None if joints is None else tuple(joints))
+        if not self.calibration.names:
+            raise ValueError("No joints to control")
+        self.names = tuple(arms)
+        self.joints = self.calibration.names
+        self.arms = [make_arm(robot, self.joints) for robot in arms.values()]
+        # EvaRobots apply their own joint calibration, so their rows of the
+        # controller calibration are left as identity
+        own = np.array([isinstance(arm, EvaRobotArm) for arm in self.arms])
+        if own.any():
+            self.calibration.offsets = np.where(own[:, None], 0.0,
+                                                self.calibration.offsets)
+            self.calibration.scales = np.where(own[:, None], 1.0,
+                                               self.calibration.scales)
+        self.control_freq = control_freq
+        self.control_period = 1.0 / control_freq
+        self.exit_key = exit_key
+        # Instance attribute, so StageTimers.instrument can time it
+        self.inverse_kinematics = inverse_kinematics_array
+
+        # Arm indices per port. The first port is served by the calling
+        # thread, every other port by a worker of its own
+        ports = {}
+        for i, arm in enumerate(self.arms):
+            ports.setdefault(arm.port, []).append(i)
+        self.ports = list(ports.values())
+        self.executor = None
+        if parallel_io and len(self.ports) > 1:
+            self.executor = ThreadPoolExecutor(len(self.ports) - 1,
+                                               thread_name_prefix="arm-io")
+        self.outgoing = None
+
+        shape = (len(self.arms), len(self.joints))
+        self.raw = np.zeros(shape)
+        self.current = np.zeros(shape)
+        self.target = np.zeros(shape)
+        self.command = np.zeros(shape)
+        self.error = np.zeros(shape)
+        self.start = np.zeros(shape)
+        self.xy = np.zeros((len(self.arms), 2))
+        self.pitch = np.zeros(len(self.arms))
+        self.ik_pending = np.zeros(len(self.arms), dtype=bool)
+
+        self.bindings = {}
+        for arm_name, controls in (joint_controls or {}).items():
+            for key, (joint, delta) in controls.items():
+                self._bind(key, JOINT, arm_name, self.joints.index(joint),
+                           delta)
+        for arm_name, controls in (xy_controls or {}).items():
+            for key, (coord, delta) in controls.items():
+                self._bind(key, XY, arm_name, XY_COORDS[coord], delta)
+        for arm_name, controls in (pitch_controls or {}).items():
+            for key, delta in controls.items():
+                self._bind(key, PITCH, arm_name, 0, delta)
+
+        # End effector arms and their lift, elbow and wrist columns
+        ee_arms = {
+            arm
+            for kind, arm, _, _ in self.bindings.values() if kind != JOINT
+        }
+        self.ee_arms = np.array(sorted(ee_arms), dtype=np.intp)
+        self.ee_mask = np.zeros(len(self.arms), dtype=bool)
+        self.ee_mask[self.ee_arms] = True
+        self.level = np.zeros(len(self.arms))
+        if ee_arms:
+            self.lift, self.elbow, self.wrist = (
+                self.joints.index(servo.removesuffix(POS_SUFFIX))
+                for servo in (SHOULDER_LIFT, ELBOW_FLEX, WRIST_FLEX))
+
+    def _bind(self, key: str, kind: int, arm_name: str, index: int,
+              delta: float):
+        if key == self.exit_key:
+            raise ValueError(f"{arm_name} binds the exit key '{key}'")
+        if key in self.bindings:
+            raise ValueError(
+                f"Key '{key}' is bound by both "
+                f"{self.names[self.bindings[key][1]]} and {arm_name}")
+        self.bindings[key] = (kind, self.names.index(arm_name), index, delta)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    # Run io(arm indices) for every port at once, joined before returning
+    def _on_ports(self, io):
+        if self.executor is None:
+            for arms in self.ports:
+                io(arms)
+            return
+        futures = [self.executor.submit(io, arms) for arms in self.ports[1:]]
+        try:
+            io(self.ports[0])
+        finally:
+            wait(futures)
+        for future in futures:
+            future.result()
+
+    def _read_arms(self, arms: list[int]):
+        for i in arms:
+            self.arms[i].read(self.raw[i])
+
+    def _write_arms(self, arms: list[int]):
+        for i in arms:
+            self.arms[i].write(self.outgoing[i])
+
+    # Read all arms into raw, and calibrated into current
+    def read(self) -> np.ndarray:
+        self._on_ports(self._read_arms)
+        return self.calibration.apply(self.raw, out=self.current)
+
+    # Send the commanded positions (calibrated unless raw) to all arms
+    def write(self, command: np.ndarray, raw: bool = False):
+        if not raw:
+            command = self.calibration.invert(command, out=self.command)
+        self.outgoing = command
+        self._on_ports(self._write_arms)
+
+    # One P control step of all arms towards target, returns the total error.
+    # raw targets skip the calibration, like the start positions.
+    def p_control_step(self,
+                       target: np.ndarray,
+                       kp: float,
+                       raw: bool = False) -> float:
+        current = self.read()
+        if raw:
+            current = self.raw
+        np.subtract(target, current, out=self.error)
+        np.multiply(self.error, kp, out=self.command)
+        np.add(self.command, current, out=self.command)
+        self.write(self.command, raw=raw)
+        return float(np.abs(self.error, out=self.error).sum())
+
+    # Remember the raw joint angles to return to on exit
+    def read_start_positions(self) -> np.ndarray:
+        self.read()
+        np.trunc(self.raw, out=self.start)
+        return self.start
+
+    # Move all arms to zero in duration seconds, then hold zero as the target
+    def move_to_zero_position(self, duration: float = 3.0, kp: float = 0.5):
+        logger.info(f"Moving {len(self.arms)} arms to zero position in "
+                    f"{duration}s, control frequency: {self.control_freq}Hz, "
+                    f"proportional gain: {kp}")
+        self.target[:] = 0.0
+        total_steps = int(duration * self.control_freq)
+        progress_steps = max(int(self.control_freq // 2), 1)
+        rate_keeper = RateKeeper(self.control_period)
+        for step in range(total_steps):
+            self.p_control_step(self.target, kp)
+            if step % progress_steps == 0:
+                logger.info("Moving to zero position progress: %.1f%%",
+                            step / total_steps * 100)
+            rate_keeper.wait()
+        self.reset_end_effector()
+        logger.info("Arms have moved to zero position")
+
+    # End effector coordinates from the current joint targets, zero pitch
+    def reset_end_effector(self):
+        self.pitch[:] = 0.0
+        if len(self.ee_arms):
+            ee = self.ee_arms
+            self.xy[ee, 0], self.xy[ee, 1] = forward_kinematics_array(
+                self.target[ee, self.lift], self.target[ee, self.elbow])
+
+    # Return to the start positions within max_time seconds, done when the
+    # total error is below tolerance degrees per arm
+    def return_to_start_position(self,
+                                 kp: float = 0.5,
+                                 tolerance: float = 2.0,
+                                 max_time: float = 5.0):
+        logger.info("Returning to start position...")
+        rate_keeper = RateKeeper(self.control_period)
+        for _ in range(int(max_time * self.control_freq)):
+            error = self.p_control_step(self.start, kp, raw=True)
+            if error < tolerance * len(self.arms):
+                logger.info("Returned to start position")
+                break
+            rate_keeper.wait()
+        logger.info("Return to start position completed")
+
+    # Update the targets from a keyboard action, False on the exit key
+    def handle_action(self, action: Mapping) -> bool:
+        for key in action:
+            if key == self.exit_key:
+                return False
+            binding = self.bindings.get(key)
+            if binding is None:
+                continue
+            kind, arm, index, delta = binding
+            if kind == JOINT:
+                current_target = self.target[arm, index]
+                self.target[arm, index] = int(current_target + delta)
+                logger.info("%s target %s: %s -> %s", self.names[arm],
+                            self.joints[index], current_target,
+                            self.target[arm, index])
+            elif kind == XY:
+                self.xy[arm, index] += delta
+                self.ik_pending[arm] = True
+                logger.info("%s end effector: (%.4f, %.4f)", self.names[arm],
+                            self.xy[arm, 0], self.xy[arm, 1])
+            else:
+                self.pitch[arm] += delta
+                logger.info("%s pitch: %.3f", self.names[arm],
+                            self.pitch[arm])
+
+        # Solve the targets of every moved arm in one call
+        if self.ik_pending.any():
+            arms = np.flatnonzero(self.ik_pending)
+            self.target[arms, self.lift], self.target[arms, self.elbow] = \
+                self.inverse_kinematics(self.xy[arms, 0], self.xy[arms, 1])
+            self.ik_pending[:] = False
+        return True
+
+    # One control tick: level the wrists, then P control towards the targets
+    def step(self, kp: float = 0.5) -> float:
+        if len(self.ee_arms):
+            np.add(self.target[:, self.lift],
+                   self.target[:, self.elbow],
+                   out=self.level)
+            np.subtract(self.pitch, self.level, out=self.level)
+            np.copyto(self.target[:, self.wrist],
+                      self.level,
+                      where=self.ee_mask)
+        return self.p_control_step(self.target, kp)
+
+    # Drive the lift and elbow of arm_name along a planned Cartesian
+    # trajectory, one sample per tick. step keeps the wrist level, so the
+    # arm needs xy or pitch bindings. Returns the error of the last tick.
+    def follow(self,
+               arm_name: str,
+               trajectory: JointTrajectory,
+               kp: float = 0.5) -> float:
+        arm = self.names.index(arm_name)
+        if not self.ee_mask[arm]:
+            raise ValueError(f"{arm_name} has no end effector bindings")
+        logger.info(f"{arm_name} following a {trajectory.duration:.2f}s "
+                    f"trajectory")
+        # Tick times like the planner's, the last one exactly at the end
+        ticks = int(np.ceil(trajectory.duration / self.control_period - 1e-9))
+        times = np.arange(ticks + 1) * self.control_period
+        times[-1] = trajectory.duration
+        rate_keeper = RateKeeper(self.control_period)
+        error = 0.0
+        for t in times:
+            self.target[arm, self.lift], self.target[arm, self.elbow] = \
+                trajectory.sample(t)
+            error = self.step(kp)
+            rate_keeper.wait()
+        # Keys continue from the end of the trajectory
+        self.xy[arm] = trajectory.x[-1], trajectory.y[-1]
+        return error
+
+    # Follow the keyboard until the exit key, then return to the start
+    # positions
+    def p_control_loop(self, keyboard, kp: float = 0.5):
+        logger.info(f"Starting P control loop, control frequency: "
+                    f"{self.control_freq}Hz, proportional gain: {kp}")
+        rate_keeper = RateKeeper(self.control_period)
+        while True:
+            try:
+                action = keyboard.get_action()
+                if action and not self.handle_action(action):
+                    logger.info(f"Control loop stats: {rate_keeper}")
+                    logger.info("Exit command detected, returning to start "
+                                "position...")
+                    self.return_to_start_position(0.2)
+                    return
+                self.step(kp)
+                rate_keeper.wait()
+            except KeyboardInterrupt:
+                logger.info("User interrupted program")
+                break
+            except Exception as e:
+                logger.error(f"P control loop error: {e}")
+                traceback.print_exc()
+                break
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from utils.LogFormatter import get_custom_logger
+
+if TYPE_CHECKING:
+    from lerobot.motors.feetech import FeetechMotorsBus
+
+logger = get_custom_logger()
+
+PRESENT_POSITION = "Present_Position"
+PRESENT_VELOCITY = "Present_Velocity"
+PRESENT_LOAD = "Present_Load"
+
+# Snapshots older than this many poll periods are stale by default
+MAX_MISSED_POLLS = 5
+
+
+# Poll registers of a bus in a background thread.
+# Snapshots go into a double buffer: the thread fills the back buffer and
+# flips the front index, readers never wait for the serial port.
+# A snapshot older than max_age (s) is stale, e.g. when polling fails.
+class BusReader:
+    bus: FeetechMotorsBus
+    lock: threading.Lock
+    data_names: tuple[str]
+    rate: float
+    max_age: float
+
+    def __init__(self,
+                 bus: FeetechMotorsBus,
+                 lock: threading.Lock,
+                 data_names: tuple[str] = (PRESENT_POSITION, ),
+                 rate: float = 100.0,
+                 max_age: float = None):
+        self.bus = bus
+        self.lock = lock
+        self.data_names = data_names
+        self.rate = rate
+        self.max_age = max_age if max_age else MAX_MISSED_POLLS / rate
+        self.buffers = [{}, {}]
+        self.times = [0.0, 0.0]
+        self.front = 0
+        self.errors = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run,
+                                       name=f"BusReader({self.bus.port})",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    # Latest values of the register, None before the first poll
+    def latest(self, data_name: str) -> dict:
+        return self.buffers[self.front].get(data_name)
+
+    # perf_counter time of the latest snapshot
+    @property
+    def latest_time(self) -> float:
+        return self.times[self.front]
+
+    # Latest values of the register, None if missing or stale
+    def fresh(self, data_name: str) -> dict:
+        front = self.front
+        if time.perf_counter() - self.times[front] > self.max_age:
+            return None
+        return self.buffers[front].get(data_name)
+
+    def poll(self):
+        back = 1 - self.front
+        buffer = self.buffers[back]
+        for data_name in self.data_names:
+            with self.lock:
+                values = self.bus.sync_read(data_name)
+            # A new dict per read, so a dict handed to a reader never changes
+            buffer[data_name] = values
+        self.times[back] = time.perf_counter()
+        self.front = back
+
+    def _run(self):
+        period = 1.0 / self.rate
+        next_poll = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Reading %s failed: %s", self.bus.port, e)
+            next_poll += period
+            delay = next_poll - time.perf_counter()
+            if delay < 0:
+                next_poll = time.perf_counter()
+                delay = 0
+            self.stop_event.wait(delay)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from BusReader import BusReader, PRESENT_POSITION
+from CalibrationCache import is_verified, load_calibration, mark_verified
+from constants import EvaRobotConfig
+from utils.LogFormatter import get_custom_logger
+
+if TYPE_CHECKING:
+    from lerobot.motors.feetech import FeetechMotorsBus
+
+logger = get_custom_logger()
+
+
+# Default bus factory, lerobot takes seconds to import so it is only
+# imported once a real bus is created
+def feetech_bus(**kwargs) -> FeetechMotorsBus:
+    from lerobot.motors.feetech import FeetechMotorsBus
+    return FeetechMotorsBus(**kwargs)
+
+
+# One FeetechMotorsBus per serial port, shared by every limb on that port.
+# Inside a tick, reads are served from a single sync_read of all motors and
+# writes are merged into a single sync_write when the tick ends.
+# With a background reader, reads are served from its latest snapshot.
+class SharedBus:
+    port: str
+    bus: FeetechMotorsBus
+    reader: BusReader
+
+    # cache_dir of the parsed calibration files and the verified ports, see
+    # CalibrationCache. Ports are only recorded as verified for real buses
+    # or an explicit cache_dir, a simulated bus never vouches for a port.
+    def __init__(self,
+                 port: str,
+                 configs: list[EvaRobotConfig],
+                 bus_factory=feetech_bus,
+                 cache_dir: Path = None):
+        self.port = port
+        self.configs = configs
+        self.cache_dir = cache_dir
+        self.records_verification = (bus_factory is feetech_bus
+                                     or cache_dir is not None)
+        motors, calibration = {}, {}
+        for config in configs:
+            for name, motor in config.motors.items():
+                if name in motors:
+                    raise ValueError(
+                        f"Motor {name} is defined twice on port {port}")
+                motors[name] = motor
+            calibration.update(
+                load_calibration(config.calibration_dir, config.id,
+                                 cache_dir))
+        ids = [motor.id for motor in motors.values()]
+        if len(ids) != len(set(ids)):
+            raise ValueError(f"Duplicate motor ids {ids} on port {port}")
+
+        self.bus = bus_factory(port=port,
+                               motors=motors,
+                               calibration=calibration)
+        self.users = 0
+        self.batching = False
+        self.read_cache = {}
+        self.pending_writes = {}
+        self.lock = threading.Lock()
+        self.reader = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.bus.is_connected
+
+    # Open the port. With trust_calibration, a port verified against the
+    # same calibration files before skips the handshake; any other port
+    # is checked once (a calibration read per motor) and a match is
+    # remembered. A mismatch is only reported, recalibrate the limbs to
+    # fix it. Without trust_calibration nothing is read beyond the
+    # handshake.
+    def open(self, trust_calibration: bool = False):
+        if self.bus.is_connected:
+            return
+        verified = trust_calibration and self.records_verification and all(
+            is_verified(config.calibration_dir, config.id, self.port,
+                        self.cache_dir) for config in self.configs)
+        self.bus.connect(handshake=not verified)
+        if not trust_calibration or verified or not self.bus.calibration:
+            return
+        if not self.bus.is_calibrated:
+            logger.warning(f"Motors on {self.port} do not match the "
+                           f"calibration files of "
+                           f"{[config.id for config in self.configs]}")
+            return
+        if not self.records_verification:
+            return
+        for config in self.configs:
+            mark_verified(config.calibration_dir, config.id, self.port,
+                          self.cache_dir)
+
+    # Connect on the first user, later users share the open port
+    def connect(self):
+        if self.users == 0:
+            self.open()
+        self.users += 1
+
+    # Disconnect when the last user is gone
+    def disconnect(self):
+        if self.users == 0:
+            return
+        self.users -= 1
+        if self.users == 0:
+            self.stop_reader()
+            self.bus.disconnect()
+
+    # Serve sync_read from a BusReader, polled by its own thread once
+    # started or by the caller, see EvaRuntime
+    def attach_reader(self,
+                      data_names: tuple[str] = (PRESENT_POSITION, ),
+                      rate: float = 100.0) -> BusReader:
+        if self.reader is None:
+            self.reader = BusReader(self.bus, self.lock, data_names, rate)
+        return self.reader
+
+    def start_reader(self,
+                     data_names: tuple[str] = (PRESENT_POSITION, ),
+                     rate: float = 100.0):
+        self.attach_reader(data_names, rate).start()
+
+    def stop_reader(self):
+        if self.reader is not None:
+            self.reader.stop()
+            self.reader = None
+
+    def sync_read(self, data_name: str, motors: list[str]) -> dict:
+        # A stale snapshot, e.g. of a failing reader, is read again
+        values = self.reader.fresh(data_name) if self.reader else None
+        if values is None and self.batching:
+            values = self.read_cache.get(data_name)
+            if values is None:
+                with self.lock:
+                    values = self.bus.sync_read(data_name)
+                self.read_cache[data_name] = values
+        if values is None:
+            with self.lock:
+                return self.bus.sync_read(data_name, motors)
+        return {motor: values[motor] for motor in motors}
+
+    def sync_write(self, data_name: str, values: dict):
+        if not self.batching:
+            with self.lock:
+                return self.bus.sync_write(data_name, values)
+        self.pending_writes.setdefault(data_name, {}).update(values)
+
+    def begin_tick(self):
+        self.batching = True
+        self.read_cache.clear()
+
+    def end_tick(self):
+        self.write_all(self.take_writes())
+
+    # End the tick without writing, returns the merged writes
+    # {data_name: values} for the caller to write later
+    def take_writes(self) -> dict[str, dict]:
+        self.batching = False
+        pending, self.pending_writes = self.pending_writes, {}
+        return pending
+
+    def write_all(self, writes: dict[str, dict]):
+        for data_name, values in writes.items():
+            with self.lock:
+                self.bus.sync_write(data_name, values)
+
+
+# The part of a SharedBus owned by one limb, used as EvaRobot.bus
+class LimbBus:
+    shared: SharedBus
+    motors: list[str]
+
+    def __init__(self, shared: SharedBus, motors: list[str]):
+        self.shared = shared
+        self.motors = motors
+
+    @property
+    def is_connected(self) -> bool:
+        return self.shared.is_connected
+
+    def connect(self):
+        return self.shared.connect()
+
+    def disconnect(self):
+        return self.shared.disconnect()
+
+    def sync_read(self, data_name: str, motors: list[str] = None) -> dict:
+        return self.shared.sync_read(data_name,
+                                     self.motors if motors is None else motors)
+
+    def sync_write(self, data_name: str, values: dict):
+        return self.shared.sync_write(data_name, values)
+
+
+class BusRegistry:
+    configs: dict[str, list[EvaRobotConfig]]
+    buses: dict[str, SharedBus]
+
+    # bus_factory creates the bus of a port, e.g. SimulatedMotorsBus
+    # cache_dir of the calibration cache, see SharedBus
+    def __init__(self,
+                 configs: list[EvaRobotConfig],
+                 bus_factory=feetech_bus,
+                 cache_dir: Path = None):
+        self.bus_factory = bus_factory
+        self.cache_dir = cache_dir
+        self.configs = {}
+        for config in configs:
+            self.configs.setdefault(config.port, []).append(config)
+        self.buses = {}
+
+    # Get the bus for the given limb, the shared bus is created on first use
+    def get_bus(self, config: EvaRobotConfig) -> LimbBus:
+        if config not in self.configs.get(config.port, []):
+            raise ValueError(f"{config.id} is not registered")
+
+        shared = self.buses.get(config.port)
+        if shared is None:
+            shared = SharedBus(config.port, self.configs[config.port],
+                               self.bus_factory, self.cache_dir)
+            self.buses[config.port] = shared
+            logger.info(f"Bus on {config.port} shared by "
+                        f"{[c.id for c in self.configs[config.port]]}")
+        return LimbBus(shared, list(config.motors))
+
+    # Create and open the buses of every registered port, one thread per
+    # port, see SharedBus.open. Limbs connecting later share the open port
+    def connect(self, trust_calibration: bool = False):
+        for configs in self.configs.values():
+            self.get_bus(configs[0])
+        with ThreadPoolExecutor(max_workers=len(self.buses)) as executor:
+            list(
+                executor.map(lambda bus: bus.open(trust_calibration),
+                             self.buses.values()))
+
+    # Poll every bus in the background, see BusReader
+    def start_readers(self,
+                      data_names: tuple[str] = (PRESENT_POSITION, ),
+                      rate: float = 100.0):
+        for bus in self.buses.values():
+            bus.start_reader(data_names, rate)
+
+    def stop_readers(self):
+        for bus in self.buses.values():
+            bus.stop_reader()
+
+    def begin_tick(self):
+        for bus in self.buses.values():
+            bus.begin_tick()
+
+    def end_tick(self):
+        for bus in self.buses.values():
+            bus.end_tick()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from utils.LogFormatter import get_custom_logger
+
+if TYPE_CHECKING:
+    from lerobot.motors import MotorCalibration
+
+logger = get_custom_logger()
+
+# Parsed calibrations are pickled into this directory next to the files,
+# unless the caller passes its own cache_dir (e.g. a temporary directory
+# for simulated buses, so their ports are never recorded as verified)
+CACHE_DIR = ".cache"
+
+# Cache file path -> cache entry, see _load_entry
+_entries: dict[Path, dict] = {}
+
+
+def _cache_path(fpath: Path, cache_dir: Path = None) -> Path:
+    if cache_dir is None:
+        cache_dir = fpath.parent / CACHE_DIR
+    return Path(cache_dir) / f"{fpath.stem}.pickle"
+
+
+# Cache entry of a calibration file:
+# {"mtime_ns": ..., "calibration": {motor: MotorCalibration},
+#  "verified": {port, ...}}
+# The file is parsed with draccus once, later loads (also from other
+# processes) use the pickled entry until the file is modified.
+def _load_entry(fpath: Path, cache_dir: Path = None) -> dict:
+    mtime = fpath.stat().st_mtime_ns
+    path = _cache_path(fpath, cache_dir)
+    entry = _entries.get(path)
+    if entry is not None and entry["mtime_ns"] == mtime:
+        return entry
+
+    entry = _read_entry(fpath, path)
+    if entry is None or entry.get("mtime_ns") != mtime:
+        import draccus
+        from lerobot.motors import MotorCalibration
+        with open(fpath) as f, draccus.config_type("json"):
+            calibration = draccus.load(dict[str, MotorCalibration], f)
+        entry = {
+            "mtime_ns": mtime,
+            "calibration": calibration,
+            "verified": set()
+        }
+        _write_entry(fpath, path, entry)
+    _entries[path] = entry
+    return entry
+
+
+def _read_entry(fpath: Path, path: Path) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring calibration cache of {fpath}: {e}")
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _write_entry(fpath: Path, path: Path, entry: dict):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Replace atomically, a concurrent reader never sees half a file
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not cache the calibration of {fpath}: {e}")
+
+
+def load_calibration(dir: Path,
+                     id: str,
+                     cache_dir: Path = None) -> dict[str, MotorCalibration]:
+    return dict(
+        _load_entry(Path(dir) / f"{id}.json", cache_dir)["calibration"])
+
+
+# Whether the motors on port were found to hold this calibration file
+def is_verified(dir: Path, id: str, port: str, cache_dir: Path = None) -> bool:
+    return port in _load_entry(Path(dir) / f"{id}.json",
+                               cache_dir)["verified"]
+
+
+# Remember that the motors on port hold this calibration file, until the
+# file is modified
+def mark_verified(dir: Path, id: str, port: str, cache_dir: Path = None):
+    fpath = Path(dir) / f"{id}.json"
+    entry = _load_entry(fpath, cache_dir)
+    if port not in entry["verified"]:
+        entry["verified"].add(port)
+        _write_entry(fpath, _cache_path(fpath, cache_dir), entry)
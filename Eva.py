@@ -1,54 +1,242 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
 from constants import EvaRobotConfig, RETURN_KEY
+from BusReader import PRESENT_POSITION
+from BusRegistry import BusRegistry, feetech_bus
 from EvaArm import EvaArm
 from EvaFoot import EvaFoot
 
-from lerobot.teleoperators.keyboard import KeyboardTeleop, KeyboardTeleopConfig
-from utils import get_custom_logger
+from EvaInput import CombinedInput
+from EvaRobot import EvaRobot
+from RobotPosition import JointSchema, RobotPosition
+from Telemetry import GOAL, TelemetryRecorder, iter_telemetry, read_header
+from utils import get_custom_logger, RateKeeper, StageTimers
+
+if TYPE_CHECKING:
+    from EvaKeyboard import EvaKeyboard
 
 logger = get_custom_logger()
 
 
+# Map every key to the (limb, servo, delta) it controls
+def build_key_index(
+        robots: list[EvaRobot]) -> dict[str, tuple[EvaRobot, str, int]]:
+    key_index = {}
+    for robot in robots:
+        for key, (servo_name, delta) in robot.config.robot_controls.items():
+            if key == RETURN_KEY:
+                raise ValueError(
+                    f"{robot.config.id} binds the return key '{key}'")
+            if key in key_index:
+                raise ValueError(
+                    f"Key '{key}' is bound by both "
+                    f"{key_index[key][0].config.id} and {robot.config.id}")
+            key_index[key] = (robot, servo_name, delta)
+    return key_index
+
+
 class Eva:
-    keyboard: KeyboardTeleop
+    keyboard: EvaKeyboard
+    input: CombinedInput
     left_arm: EvaArm
     right_arm: EvaArm
+    foot: EvaFoot
+    bus_registry: BusRegistry
+    key_index: dict[str, tuple[EvaRobot, str, int]]
+    rate_keeper: RateKeeper
+    stage_timers: StageTimers
+    jog: bool
+    telemetry: TelemetryRecorder
 
-    def __init__(self, left_arm_config: EvaRobotConfig,
+    # If reader_rate is set, positions (and reader_data registers) are
+    # polled by a background thread per bus instead of the control loop.
+    # bus_factory and keyboard replace the hardware, e.g. for simulation.
+    # inputs are further connected sources (GamepadInput, NetworkInput)
+    # read together with the keyboard, see EvaInput.
+    # With jog, held keys move their servos at a velocity that ramps up and
+    # down, instead of stepping to a new target per key
+    # With stage_timers, the hot path stages are timed, see instrument()
+    # With telemetry, every limb's reads and writes are recorded
+    # With trust_calibration, ports whose motors matched the calibration
+    # files before skip the handshake, see SharedBus.open
+    # calibration_cache_dir replaces the cache next to the calibration
+    # files, see CalibrationCache
+    def __init__(self,
+                 left_arm_config: EvaRobotConfig,
                  right_arm_config: EvaRobotConfig,
-                 foot_config: EvaRobotConfig):
-        self.keyboard = self.init_keyboard()
-        self.left_arm = EvaArm(left_arm_config)
-        self.right_arm = EvaArm(right_arm_config)
-        self.foot = EvaFoot(foot_config)
+                 foot_config: EvaRobotConfig,
+                 reader_rate: float = None,
+                 reader_data: tuple[str] = (PRESENT_POSITION, ),
+                 bus_factory=feetech_bus,
+                 keyboard: EvaKeyboard = None,
+                 inputs: list = (),
+                 jog: bool = False,
+                 stage_timers: StageTimers = None,
+                 telemetry: TelemetryRecorder = None,
+                 trust_calibration: bool = False,
+                 calibration_cache_dir: Path = None):
+        self.keyboard = keyboard if keyboard else self.init_keyboard()
+        self.input = CombinedInput([self.keyboard, *inputs])
+        self.jog = jog
+        # Limbs on the same serial port share one bus, the ports are
+        # opened in parallel
+        self.bus_registry = BusRegistry(
+            [left_arm_config, right_arm_config, foot_config], bus_factory,
+            calibration_cache_dir)
+        self.bus_registry.connect(trust_calibration)
+        self.left_arm = EvaArm(left_arm_config,
+                               self.bus_registry.get_bus(left_arm_config))
+        self.right_arm = EvaArm(right_arm_config,
+                                self.bus_registry.get_bus(right_arm_config))
+        self.foot = EvaFoot(foot_config,
+                            self.bus_registry.get_bus(foot_config))
+        if reader_rate:
+            self.bus_registry.start_readers(reader_data, reader_rate)
+        self.key_index = build_key_index(
+            [self.left_arm, self.right_arm, self.foot])
+        self.control_interval = left_arm_config.control_interval
+        self.rate_keeper = RateKeeper(self.control_interval)
+        self.stage_timers = stage_timers
+        if stage_timers is not None:
+            self.instrument(stage_timers)
+        self.telemetry = telemetry
+        if telemetry is not None:
+            for robot in (self.left_arm, self.right_arm, self.foot):
+                robot.attach_telemetry(telemetry)
 
         logger.info(f"Eva initialization complete!")
 
-    def init_keyboard(self) -> KeyboardTeleop:
+    @staticmethod
+    def init_keyboard() -> EvaKeyboard:
+        from EvaKeyboard import EvaKeyboard
+        from lerobot.teleoperators.keyboard import KeyboardTeleopConfig
         config = KeyboardTeleopConfig()
-        keyboard = KeyboardTeleop(config)
+        keyboard = EvaKeyboard(config)
         keyboard.connect()
         return keyboard
 
+    # Time bus reads and writes per limb, keyboard input, logging and sleep
+    def instrument(self, stage_timers: StageTimers):
+        for robot in (self.left_arm, self.right_arm, self.foot):
+            for name in ("get_current_position", "move_to_position"):
+                stage_timers.instrument(robot, name,
+                                        f"{robot.config.id}.{name}")
+        stage_timers.instrument(self.keyboard, "get_action",
+                                "keyboard.get_action")
+        stage_timers.instrument(self.rate_keeper, "wait", "sleep")
+        for handler in logger.handlers:
+            stage_timers.instrument(handler, "emit", "logging")
+
     def run(self):
         logger.info(f"Eva running...")
 
+        self.rate_keeper.start()
         while True:
-            kb_action = self.keyboard.get_action()
-            left_position, right_position, foot_position = None, None, None
-            if kb_action:
-                # Process keyboard input, update target positions
-                for key, _ in kb_action.items():
-                    if key == RETURN_KEY:
-                        return
-                    left_position = self.left_arm.get_next_position(key)
-                    right_position = self.right_arm.get_next_position(key)
-                    foot_position = self.foot.get_next_position(key)
-            if left_position:
-                self.left_arm.move_to_position_in_loop(left_position)
-            if right_position:
-                self.right_arm.move_to_position_in_loop(right_position)
-            if foot_position:
-                self.foot.move_to_position_in_loop(foot_position)
+            # Reads and writes within a tick are merged per bus
+            self.bus_registry.begin_tick()
+
+            action = self.input.get_action()
+            if RETURN_KEY in action:
+                self.bus_registry.end_tick()
+                logger.info("Eva loop stats: %s", self.rate_keeper)
+                return
+            self.apply_action(action)
+            self.bus_registry.end_tick()
+
+            # Sleep until the next tick
+            self.rate_keeper.wait()
+            if self.stage_timers is not None:
+                self.stage_timers.log_summary_if_due(logger)
+
+    # One control tick of every limb for the keys of an input action
+    def apply_action(self, action: dict):
+        robots = (self.left_arm, self.right_arm, self.foot)
+        # Sum the deltas of all keys in the batch per limb and servo,
+        # scaled by the presses or stick deflection of each key. A key
+        # without a magnitude is one press, a zero magnitude moves nothing
+        deltas = {}
+        for key, amount in action.items():
+            binding = self.key_index.get(key)
+            if binding is None or amount == 0:
+                continue
+            robot, servo_name, delta = binding
+            robot_deltas = deltas.setdefault(robot, {})
+            robot_deltas[servo_name] = robot_deltas.get(
+                servo_name, 0) + delta * (1 if amount is None else amount)
+
+        if self.jog:
+            # A delta held for one tick is a velocity of speed per tick,
+            # limbs without keys slow down to a stop
+            for robot in robots:
+                scale = robot.config.speed / self.control_interval
+                robot.set_jog_velocity({
+                    servo_name: delta * scale
+                    for servo_name, delta in deltas.get(robot, {}).items()
+                })
+                robot.jog_step(self.control_interval)
+        else:
+            # Only the limbs that own a key read their position
+            for robot, robot_deltas in deltas.items():
+                robot.set_target(
+                    robot.get_position_after_deltas(robot_deltas))
+            # Every limb moves one interpolation step per tick
+            for robot in robots:
+                robot.step()
+
+    # Replay the goal positions of a telemetry file at speed times the
+    # recorded timing. Playback time advances one control interval per
+    # tick, so the same goals land on the same tick on every replay.
+    def replay(self, path, speed: float = 1.0):
+        logger.info(f"Eva replaying {path} at {speed}x...")
+
+        _, names = read_header(path)
+        robots = {
+            robot.config.id: robot
+            for robot in (self.left_arm, self.right_arm, self.foot)
+        }
+        missing = set(names["limbs"]) - set(robots)
+        if missing:
+            raise ValueError(f"Unknown limbs {sorted(missing)} in {path}")
+        limbs = [robots[name] for name in names["limbs"]]
+        schemas = [
+            JointSchema.get(tuple(joints)) for joints in names["joints"]
+        ]
+
+        step = self.control_interval * speed
+        playback = 0.0
+        start = None
+        self.rate_keeper.start()
+        # Goals within a tick are merged into one sync_write per bus
+        self.bus_registry.begin_tick()
+        for records in iter_telemetry(path):
+            records = records[records["kind"] == GOAL]
+            for t, limb, values in zip(records["time"], records["limb"],
+                                       records["values"]):
+                if start is None:
+                    start = t
+                while t - start > playback:
+                    self.bus_registry.end_tick()
+                    self.rate_keeper.wait()
+                    self.bus_registry.begin_tick()
+                    playback += step
+                schema = schemas[limb]
+                values = values[:len(schema.names)]
+                if np.isnan(values).any():
+                    # Only part of the joints were commanded
+                    target = RobotPosition({
+                        name: value
+                        for name, value in zip(schema.names, values)
+                        if not np.isnan(value)
+                    })
+                else:
+                    target = RobotPosition.from_values(schema, values)
+                limbs[limb].move_to_position(target)
+        self.bus_registry.end_tick()
+        logger.info("Eva replay stats: %s", self.rate_keeper)
 
     def disconnect(self):
         logger.info(f"Eva disconnecting...")
@@ -58,6 +246,12 @@ class Eva:
         self.right_arm.move_to_default_position()
 
         # Disconnect
-        self.keyboard.disconnect()
+        self.input.disconnect()
         self.left_arm.disconnect()
         self.right_arm.disconnect()
+        self.foot.disconnect()
+
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.stage_timers is not None:
+            logger.info(f"Stage timers: {self.stage_timers}")
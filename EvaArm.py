@@ -1,17 +1,19 @@
-import constants
-import time
+from __future__ import annotations
 
-from lerobot.robots.so100_follower import SO100Follower, SO100FollowerConfig
+from typing import TYPE_CHECKING
 
 from utils.LogFormatter import get_custom_logger
 from EvaRobot import EvaRobot
 from constants import EvaRobotConfig
 
+if TYPE_CHECKING:
+    from lerobot.motors.feetech import FeetechMotorsBus
+
 logger = get_custom_logger()
 
 
 class EvaArm(EvaRobot):
 
-    def __init__(self, config: EvaRobotConfig):
-        super().__init__(config)
+    def __init__(self, config: EvaRobotConfig, bus: FeetechMotorsBus = None):
+        super().__init__(config, bus)
         self.bus.connect()
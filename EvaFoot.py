@@ -1,6 +1,13 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from EvaRobot import EvaRobot
 import constants
 
+if TYPE_CHECKING:
+    from lerobot.motors.feetech import FeetechMotorsBus
+
 from utils.LogFormatter import get_custom_logger
 
 logger = get_custom_logger()
@@ -8,8 +15,10 @@ logger = get_custom_logger()
 
 class EvaFoot(EvaRobot):
 
-    def __init__(self, config: constants.EvaRobotConfig):
-        super().__init__(config)
+    def __init__(self,
+                 config: constants.EvaRobotConfig,
+                 bus: FeetechMotorsBus = None):
+        super().__init__(config, bus)
         self.bus.connect()
 
 
@@ -0,0 +1,248 @@
+import json
+import socket
+import threading
+import time
+from typing import Any
+
+from constants import GAMEPAD_AXES, GAMEPAD_BUTTONS, RETURN_KEY
+from utils.LogFormatter import get_custom_logger
+
+logger = get_custom_logger()
+
+# Linux input event types, see linux/input-event-codes.h
+EV_KEY = 0x01
+EV_ABS = 0x03
+
+
+# Input sources report, once per control tick, the keys of
+# EvaRobotConfig.robot_controls that are active with a magnitude: the
+# number of presses for keys, the deflection for analog sticks. Events
+# arriving between two ticks are coalesced into that one action.
+class CombinedInput:
+    sources: list
+
+    def __init__(self, sources: list):
+        self.sources = sources
+
+    def connect(self):
+        for source in self.sources:
+            source.connect()
+
+    def disconnect(self):
+        for source in self.sources:
+            source.disconnect()
+
+    # Magnitudes of a key held on several sources add up
+    def get_action(self) -> dict[str, Any]:
+        action = {}
+        for source in self.sources:
+            for key, value in source.get_action().items():
+                action[key] = action.get(key, 0) + value
+        return action
+
+
+# Replays a list of actions, one per tick, then returns final (the return
+# key by default) forever. Drives Eva without a keyboard, e.g. in tests
+# and benchmarks on simulated buses.
+class ScriptedInput:
+    actions: list[dict]
+    final: dict
+
+    def __init__(self, actions: list[dict], final: dict = None):
+        self.actions = list(actions)
+        self.final = {RETURN_KEY: 1} if final is None else final
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def get_action(self) -> dict[str, Any]:
+        return self.actions.pop(0) if self.actions else self.final
+
+
+# Gamepad through evdev. A thread reads the device and keeps only the
+# latest value per axis, so get_action never waits for input events.
+class GamepadInput:
+    device_path: str
+    axes: dict[str, tuple[str, str]]
+    buttons: dict[str, str]
+    deadzone: float
+
+    # Without device_path, the first device with analog axes is used
+    def __init__(self,
+                 device_path: str = None,
+                 axes: dict[str, tuple[str, str]] = GAMEPAD_AXES,
+                 buttons: dict[str, str] = GAMEPAD_BUTTONS,
+                 deadzone: float = 0.15):
+        self.device_path = device_path
+        self.axes = axes
+        self.buttons = buttons
+        self.deadzone = deadzone
+        self.device = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.axis_keys = {}
+        self.axis_ranges = {}
+        self.button_keys = {}
+        self.axis_values = {}
+        self.held = set()
+        self.presses = {}
+
+    @property
+    def is_connected(self) -> bool:
+        return self.device is not None
+
+    def connect(self):
+        try:
+            import evdev
+        except ImportError as e:
+            raise ImportError(
+                "GamepadInput needs evdev, install it with "
+                "`pip install evdev`") from e
+
+        path = self.device_path
+        if path is None:
+            for candidate in evdev.list_devices():
+                if evdev.ecodes.EV_ABS in evdev.InputDevice(
+                        candidate).capabilities():
+                    path = candidate
+                    break
+            else:
+                raise ConnectionError("No gamepad found")
+        self.device = evdev.InputDevice(path)
+        self.resolve(evdev.ecodes.ecodes)
+        for code in self.axis_keys:
+            info = self.device.absinfo(code)
+            self.axis_ranges[code] = (info.min, info.max)
+        self.thread = threading.Thread(target=self._run,
+                                       name=f"GamepadInput({path})",
+                                       daemon=True)
+        self.thread.start()
+        logger.info(f"Gamepad {self.device.name} connected on {path}")
+
+    def disconnect(self):
+        if self.device is None:
+            return
+        # Closing the device ends the read loop of the thread
+        self.device.close()
+        self.thread.join(timeout=1.0)
+        self.device = None
+        self.thread = None
+
+    # Map the evdev code names of the bindings to event codes
+    def resolve(self, ecodes: dict[str, int]):
+        self.axis_keys = {
+            ecodes[name]: keys
+            for name, keys in self.axes.items() if name in ecodes
+        }
+        self.button_keys = {
+            ecodes[name]: key
+            for name, key in self.buttons.items() if name in ecodes
+        }
+
+    def handle_event(self, type: int, code: int, value: int):
+        if type == EV_ABS and code in self.axis_keys:
+            low, high = self.axis_ranges.get(code, (-1, 1))
+            # Scale to -1..1, the latest value of an axis wins
+            self.axis_values[code] = (2 * (value - low) /
+                                      (high - low) - 1) if high > low else 0
+        elif type == EV_KEY and code in self.button_keys:
+            key = self.button_keys[code]
+            with self.lock:
+                if value:
+                    self.held.add(key)
+                    if value == 1:
+                        self.presses[key] = self.presses.get(key, 0) + 1
+                else:
+                    self.held.discard(key)
+
+    def get_action(self) -> dict[str, Any]:
+        with self.lock:
+            presses, self.presses = self.presses, {}
+            action = {key: 1 for key in self.held}
+        action.update(presses)
+        for code, value in list(self.axis_values.items()):
+            if abs(value) <= self.deadzone:
+                continue
+            negative, positive = self.axis_keys[code]
+            key = positive if value > 0 else negative
+            # Deflection beyond the deadzone, 0..1
+            action[key] = action.get(key, 0) + (
+                (abs(value) - self.deadzone) / (1 - self.deadzone))
+        return action
+
+    def _run(self):
+        try:
+            for event in self.device.read_loop():
+                self.handle_event(event.type, event.code, event.value)
+        except OSError:
+            # The device was closed or unplugged
+            pass
+
+
+# Actions streamed over local UDP. Every datagram is a JSON object
+# {key: magnitude} with everything the sender holds; only the latest
+# datagram of a tick counts. The action is dropped once the sender has
+# been quiet for timeout seconds, so a lost sender stops the robot.
+class NetworkInput:
+    host: str
+    port: int
+    timeout: float
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 5005,
+                 timeout: float = 0.25):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.socket = None
+        self.action = {}
+        self.action_time = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        return self.socket is not None
+
+    # (host, port) the socket is bound to
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.socket.getsockname()
+
+    def connect(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((self.host, self.port))
+        self.socket.setblocking(False)
+        logger.info(f"Listening for input on udp://{self.host}:{self.port}")
+
+    def disconnect(self):
+        if self.socket is None:
+            return
+        self.socket.close()
+        self.socket = None
+
+    def get_action(self) -> dict[str, Any]:
+        latest = None
+        while True:
+            try:
+                latest = self.socket.recv(65536)
+            except BlockingIOError:
+                break
+        now = time.perf_counter()
+        if latest is not None:
+            try:
+                action = json.loads(latest)
+                if not isinstance(action, dict):
+                    raise ValueError("not an object")
+                self.action = {
+                    str(key): float(value)
+                    for key, value in action.items()
+                }
+                self.action_time = now
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Ignoring input datagram: {e}")
+        if self.action and now - self.action_time > self.timeout:
+            self.action = {}
+        return dict(self.action)
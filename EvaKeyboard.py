@@ -0,0 +1,24 @@
+from typing import Any
+
+from lerobot.teleoperators.keyboard import KeyboardTeleop
+
+
+# KeyboardTeleop only reports keys that are held when get_action is called,
+# so a key pressed and released between two ticks is lost. EvaKeyboard also
+# reports those keys, with the number of presses since the last call.
+class EvaKeyboard(KeyboardTeleop):
+    presses: dict[str, int]
+
+    def _drain_pressed_keys(self):
+        self.presses = {}
+        while not self.event_queue.empty():
+            key_char, is_pressed = self.event_queue.get_nowait()
+            self.current_pressed[key_char] = is_pressed
+            if is_pressed:
+                self.presses[key_char] = self.presses.get(key_char, 0) + 1
+
+    def get_action(self) -> dict[str, Any]:
+        action = super().get_action()
+        action = {key: 1 for key in action}
+        action.update(self.presses)
+        return action
@@ -1,12 +1,23 @@
+from __future__ import annotations
+
 import time
-import draccus
+import numpy as np
 from pathlib import Path
-from lerobot.motors.feetech import FeetechMotorsBus
-from lerobot.motors import MotorCalibration
-from lerobot.utils.errors import DeviceNotConnectedError
+from typing import TYPE_CHECKING
 
+from CalibrationCache import load_calibration
 from constants import EvaRobotConfig, RobotPosition
+from JointCalibration import JointCalibration
+from MotionProfile import MotionProfile
+from RobotPosition import JointSchema
+from Telemetry import GOAL, PRESENT, TelemetryRecorder
 from utils.LogFormatter import get_custom_logger
+from utils.RateKeeper import RateKeeper
+
+# lerobot is imported when a bus is created, it takes seconds to import
+if TYPE_CHECKING:
+    from lerobot.motors import MotorCalibration
+    from lerobot.motors.feetech import FeetechMotorsBus
 
 logger = get_custom_logger()
 
@@ -14,13 +25,31 @@ logger = get_custom_logger()
 class EvaRobot:
     config: EvaRobotConfig
     bus: FeetechMotorsBus
+    target: RobotPosition = None
+    command: RobotPosition = None
+    last_command: RobotPosition = None
+    profile: MotionProfile = None
+    profile_step: int = 0
+    position: RobotPosition = None
+    position_time: float = 0.0
+    telemetry: TelemetryRecorder = None
+    jog_schema: JointSchema = None
+    jog_target: np.ndarray = None
+    jog_velocity: np.ndarray = None
+    jog_command: RobotPosition = None
+    telemetry_limb: int = 0
+    joint_calibration: JointCalibration = None
 
     # If bus is provided, use it, otherwise create a new one
     def __init__(self, config: EvaRobotConfig, bus: FeetechMotorsBus = None):
         self.config = config
+        if config.joint_calibration:
+            self.joint_calibration = JointCalibration(
+                config.joint_calibration, tuple(config.motors))
         if bus is not None:
             self.bus = bus
         else:
+            from lerobot.motors.feetech import FeetechMotorsBus
             self.bus = FeetechMotorsBus(port=config.port,
                                         motors=config.motors,
                                         calibration=self._load_calibration(
@@ -36,77 +65,214 @@ class EvaRobot:
     def disconnect(self):
         return self.bus.disconnect()
 
+    # Record every present position read and goal position written
+    def attach_telemetry(self, telemetry: TelemetryRecorder):
+        schema = JointSchema.from_motors(tuple(self.config.motors))
+        self.telemetry_limb = telemetry.add_limb(self.config.id, schema.names)
+        self.telemetry = telemetry
+
     def _load_calibration(self, dir: Path) -> dict[str, MotorCalibration]:
-        fpath = dir / f"{self.config.id}.json"
-        with open(fpath) as f, draccus.config_type("json"):
-            return draccus.load(dict[str, MotorCalibration], f)
+        return load_calibration(dir, self.config.id)
 
+    # Read the present position from the bus and refresh the cache
     def get_current_position(self) -> RobotPosition:
         pos = self.bus.sync_read("Present_Position")
-        pos = {f"{motor}.pos": val for motor, val in pos.items()}
-        return RobotPosition(pos)
+        return self.set_present_position(pos, time.perf_counter())
+
+    # Refresh the cache from raw present positions {motor: value} read at
+    # read_time (perf_counter), e.g. a BusReader snapshot
+    def set_present_position(self, pos: dict,
+                             read_time: float) -> RobotPosition:
+        self.position = RobotPosition.from_motors(pos)
+        if self.joint_calibration is not None:
+            self.joint_calibration.take(self.position.schema.motors).apply(
+                self.position.values, out=self.position.values)
+        self.position_time = read_time
+        if self.telemetry is not None:
+            self.telemetry.record(self.telemetry_limb, PRESENT, self.position)
+        return self.position.copy()
+
+    # Get the cached present position, only read the bus when it is stale
+    def get_cached_position(self) -> RobotPosition:
+        age = time.perf_counter() - self.position_time
+        if self.position is None or age > self.config.max_position_age:
+            return self.get_current_position()
+        return self.position.copy()
 
     # Get robot's next position after the given key
     def get_next_position(self, key: str) -> RobotPosition:
         if key in self.config.robot_controls:
-            position = self.get_current_position()
             servo_name, delta = self.config.robot_controls[key]
-            position[servo_name] += delta * self.config.speed
-            return position
+            return self.get_position_after_deltas({servo_name: delta})
         return None
 
+    # Get robot's next position after moving each servo by delta steps
+    def get_position_after_deltas(self, deltas: dict[str,
+                                                      float]) -> RobotPosition:
+        position = self.get_cached_position()
+        for servo_name, delta in deltas.items():
+            position[servo_name] += delta * self.config.speed
+        return position
+
     # Check whether robot has reached the target position
     def reach_position(self, target: RobotPosition,
                        current: RobotPosition) -> bool:
         if not target:
             return False
+        if not isinstance(target, RobotPosition):
+            target = RobotPosition(target)
+        if not isinstance(current, RobotPosition):
+            current = RobotPosition(current)
 
-        for key, value in target.items():
-            delta = value - current[key]
-            if abs(delta) > self.config.error:
-                return False
-        return True
+        return bool(np.all(np.abs(current.error(target)) <= self.config.error))
 
     def move_to_default_position(self):
         return self.move_to_position(self.config.default_position)
 
     def move_to_position(self, target: RobotPosition):
         if not self.is_connected:
+            from lerobot.utils.errors import DeviceNotConnectedError
             raise DeviceNotConnectedError(
                 f"{self.config.id} is not connected.")
 
-        goal_pos = {
-            key.removesuffix(".pos"): val
-            for key, val in target.items() if key.endswith(".pos")
-        }
-        self.bus.sync_write("Goal_Position", goal_pos)
+        if not isinstance(target, RobotPosition):
+            target = RobotPosition(target)
+        if self.joint_calibration is None:
+            values = target.motor_dict()
+        else:
+            calibration = self.joint_calibration.take(target.schema.motors)
+            raw = calibration.invert(target.values[target.schema.pos_index])
+            values = dict(zip(calibration.names, raw.tolist()))
+        self.bus.sync_write("Goal_Position", values)
+        if self.telemetry is not None:
+            self.telemetry.record(self.telemetry_limb, GOAL, target)
+
+    # Per servo limits of the target's joints
+    def _joint_limits(self, schema: JointSchema, limits) -> np.ndarray:
+        if isinstance(limits, dict):
+            return np.array([limits[name] for name in schema.names],
+                            dtype=np.float64)
+        return np.full(len(schema.names), limits, dtype=np.float64)
 
-    def move_to_position_in_loop(self, target: RobotPosition):
-        logger.info(f"Moving to position {target} ")
-
-        last_position = None
-        current = self.get_current_position()
-        while True:
-            # Check if robot has reached target_positions
-            if self.reach_position(target, current):
-                logger.info(f"Moving to position {target} done!")
-                return
-
-            # Get new positions
-            for servo_name, target_pos in target.items():
-                delta = target_pos - current[servo_name]
-                delta = self.config.speed if delta > self.config.speed else delta
-                delta = -self.config.speed if delta < -self.config.speed else delta
-                current[servo_name] += delta
-
-            # Check if the new positions is roughly the same as the last positions
-            if self.reach_position(last_position, current):
-                current = self.get_current_position()
-                logger.warning(
-                    f"Moving to position {target} stuck at {current}!")
-                return
-
-            # Move to new positions and wait
+    # Set a new target, interpolation starts from the current position.
+    # Moves larger than speed are sampled from a precomputed motion profile
+    def set_target(self, target: RobotPosition):
+        if not isinstance(target, RobotPosition):
+            target = RobotPosition(target)
+        self.target = target
+        self.command = self.get_cached_position()
+        self.last_command = None
+        self.profile = None
+        self.profile_step = 0
+
+        start = self.command.take(target)
+        if np.max(np.abs(target.values - start),
+                  initial=0) > self.config.speed:
+            self.profile = MotionProfile(
+                start, target.values,
+                self._joint_limits(target.schema, self.config.max_velocity),
+                self._joint_limits(target.schema,
+                                   self.config.max_acceleration),
+                self.config.control_interval, self.config.motion_profile)
+
+    # Move one interpolation step towards the target.
+    # Return True when the robot is idle (no target, reached or stuck)
+    def step(self) -> bool:
+        target = self.target
+        if target is None:
+            return True
+
+        current = self.command
+        # Check if robot has reached target_positions
+        if self.profile is None and self.reach_position(target, current):
+            logger.info("Moving to position %s done!", target)
+            self.target = None
+            return True
+
+        if self.profile is not None:
+            # Next sample of the profile, the last one is the target
+            sample = self.profile[self.profile_step]
+            if target.schema is current.schema:
+                current.values[:] = sample
+            else:
+                current.values[current.schema.take(target.schema)] = sample
+            self.profile_step += 1
+            if self.profile_step == len(self.profile):
+                self.profile = None
             self.move_to_position(current)
-            last_position = current
-            time.sleep(self.config.control_interval)
+            return False
+
+        # Get new positions, every servo moves by at most speed
+        current.move_towards(target, self.config.speed)
+
+        # Check if the new positions is roughly the same as the last positions
+        if self.reach_position(self.last_command, current):
+            current = self.get_current_position()
+            logger.warning("Moving to position %s stuck at %s!", target,
+                           current)
+            self.target = None
+            return True
+
+        # Move to new positions
+        self.move_to_position(current)
+        if self.last_command is None:
+            self.last_command = current.copy()
+        else:
+            self.last_command.assign(current)
+        return False
+
+    # Set the velocity (deg/s) to jog servos at, servos not given stop
+    def set_jog_velocity(self, velocities: dict[str, float]):
+        if self.jog_schema is None:
+            self.jog_schema = JointSchema.from_motors(
+                tuple(self.config.motors))
+            self.jog_target = np.zeros(len(self.jog_schema.names))
+            self.jog_velocity = np.zeros(len(self.jog_schema.names))
+            self.jog_max_velocity = self._joint_limits(
+                self.jog_schema, self.config.max_velocity)
+            self.jog_max_acceleration = self._joint_limits(
+                self.jog_schema, self.config.max_acceleration)
+        self.jog_target[:] = 0
+        for servo_name, velocity in velocities.items():
+            self.jog_target[self.jog_schema.index[servo_name]] = velocity
+        np.clip(self.jog_target,
+                -self.jog_max_velocity,
+                self.jog_max_velocity,
+                out=self.jog_target)
+
+    # Ramp the jog velocity towards the set one within max_acceleration and
+    # move the command by it for one tick of dt seconds.
+    # Return True while jogging, False once every servo has stopped
+    def jog_step(self, dt: float) -> bool:
+        if self.jog_schema is None:
+            return False
+        if not self.jog_velocity.any() and not self.jog_target.any():
+            # Stopped, the next jog starts from the present position
+            self.jog_command = None
+            return False
+
+        if self.jog_command is None:
+            # A jog takes over from any move in progress
+            self.target = None
+            self.profile = None
+            position = self.get_cached_position()
+            if position.schema is not self.jog_schema:
+                position = RobotPosition.from_values(
+                    self.jog_schema,
+                    position.values[position.schema.take(self.jog_schema)])
+            self.jog_command = position
+
+        max_change = self.jog_max_acceleration * dt
+        self.jog_velocity += np.clip(self.jog_target - self.jog_velocity,
+                                     -max_change, max_change)
+        self.jog_command.values += self.jog_velocity * dt
+        self.move_to_position(self.jog_command)
+        return True
+
+    def move_to_position_in_loop(self, target: RobotPosition):
+        logger.info("Moving to position %s ", target)
+
+        self.set_target(target)
+        rate_keeper = RateKeeper(self.config.control_interval)
+        while not self.step():
+            rate_keeper.wait()
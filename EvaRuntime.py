@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from BusReader import PRESENT_POSITION
+from constants import RETURN_KEY
+from utils import get_custom_logger
+
+if TYPE_CHECKING:
+    from BusReader import BusReader
+    from BusRegistry import SharedBus
+    from Eva import Eva
+    from RobotPosition import RobotPosition
+
+logger = get_custom_logger()
+
+
+# What the control task saw and did in one tick. A new snapshot is published
+# per tick and never changes, services may keep it.
+@dataclass(frozen=True)
+class EvaState:
+    tick: int
+    time: float
+    action: dict
+    positions: dict[str, RobotPosition]
+
+
+# The serial port of one SharedBus, served by a single executor thread so its
+# calls stay in order. Polls the reader data at rate and writes what the
+# control task submits as soon as it arrives.
+class BusTask:
+    shared: SharedBus
+    reader: BusReader
+    executor: ThreadPoolExecutor
+
+    def __init__(self, shared: SharedBus, data_names: tuple[str],
+                 rate: float):
+        self.shared = shared
+        self.reader = shared.attach_reader(data_names, rate)
+        self.period = 1.0 / rate
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"BusTask({shared.port})")
+        self.pending = {}
+        self.wake = asyncio.Event()
+        self.errors = 0
+
+    # Merge writes {data_name: values} into the next write of the port
+    def submit(self, writes: dict[str, dict]):
+        if not writes:
+            return
+        for data_name, values in writes.items():
+            self.pending.setdefault(data_name, {}).update(values)
+        self.wake.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_poll = time.perf_counter()
+        while True:
+            self.wake.clear()
+            if self.pending:
+                pending, self.pending = self.pending, {}
+                await loop.run_in_executor(self.executor,
+                                           self.shared.write_all, pending)
+            if time.perf_counter() >= next_poll:
+                try:
+                    await loop.run_in_executor(self.executor,
+                                               self.reader.poll)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("Reading %s failed: %s", self.shared.port,
+                                   e)
+                next_poll = max(next_poll + self.period, time.perf_counter())
+            if self.pending:
+                continue
+            try:
+                await asyncio.wait_for(self.wake.wait(),
+                                       next_poll - time.perf_counter())
+            except asyncio.TimeoutError:
+                pass
+
+    # Write what is left once the task is cancelled, then free the thread
+    def close(self):
+        self.executor.shutdown()
+        pending, self.pending = self.pending, {}
+        self.shared.write_all(pending)
+
+
+# Runs Eva as asyncio tasks instead of the blocking Eva.run loop:
+#   one BusTask per serial port doing all of its I/O in an executor,
+#   a control task reading Eva.input and stepping the limbs once per
+#       control interval, it only reads the latest polled positions and
+#       hands its writes to the BusTasks, so it never waits for a serial
+#       port,
+#   services, coroutine functions called with the runtime, e.g. telemetry
+#       consumers or a command server, awaiting next_state().
+# Ends with the return key like Eva.run.
+class EvaRuntime:
+    eva: Eva
+    state: EvaState
+    bus_tasks: list[BusTask]
+
+    # poll_rate (Hz) of the reader data, the control rate by default
+    def __init__(self,
+                 eva: Eva,
+                 poll_rate: float = None,
+                 reader_data: tuple[str] = (PRESENT_POSITION, ),
+                 services: list = ()):
+        self.eva = eva
+        self.poll_rate = poll_rate or 1.0 / eva.control_interval
+        self.reader_data = reader_data
+        self.services = list(services)
+        self.state = None
+        self.bus_tasks = []
+        self.tick = None
+
+    def run(self):
+        asyncio.run(self.main())
+
+    async def main(self):
+        logger.info(f"Eva runtime running...")
+
+        registry = self.eva.bus_registry
+        # Polled by the BusTasks instead of reader threads
+        registry.stop_readers()
+        self.bus_tasks = [
+            BusTask(shared, self.reader_data, self.poll_rate)
+            for shared in registry.buses.values()
+        ]
+        self.tick = asyncio.Condition()
+        # Start from fresh positions
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(task.executor,
+                                                    task.reader.poll)
+                               for task in self.bus_tasks))
+
+        tasks = [asyncio.create_task(task.run()) for task in self.bus_tasks]
+        tasks.extend(
+            asyncio.create_task(self._serve(service))
+            for service in self.services)
+        control = asyncio.create_task(self.control())
+        try:
+            # A failing bus ends the run like it ends Eva.run
+            await asyncio.wait([control, *tasks[:len(self.bus_tasks)]],
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            control.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(control, *tasks, return_exceptions=True)
+            for bus_task in self.bus_tasks:
+                bus_task.close()
+            registry.stop_readers()
+        for task in (control, *tasks):
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def control(self):
+        eva = self.eva
+        rate_keeper = eva.rate_keeper
+        rate_keeper.start()
+        while True:
+            eva.bus_registry.begin_tick()
+            # Sampled once per tick like Eva.run, a held key moves its
+            # servo by the same step every tick
+            action = eva.input.get_action()
+            if RETURN_KEY in action:
+                self._submit_writes()
+                logger.info("Eva runtime stats: %s", rate_keeper)
+                return
+            eva.apply_action(action)
+            self._submit_writes()
+            await self._publish(action)
+
+            await rate_keeper.wait_async()
+            if eva.stage_timers is not None:
+                eva.stage_timers.log_summary_if_due(logger)
+
+    def _submit_writes(self):
+        for bus_task in self.bus_tasks:
+            bus_task.submit(bus_task.shared.take_writes())
+
+    # Every limb's position is refreshed from the latest snapshot of its
+    # BusTask's reader without any bus I/O. A stale snapshot keeps the last
+    # cached position, a limb without any is left out of the tick.
+    async def _publish(self, action: dict):
+        positions = {}
+        for robot in (self.eva.left_arm, self.eva.right_arm, self.eva.foot):
+            reader = robot.bus.shared.reader
+            values = reader.fresh(PRESENT_POSITION)
+            if values is not None:
+                positions[robot.config.id] = robot.set_present_position(
+                    {motor: values[motor]
+                     for motor in robot.bus.motors}, reader.latest_time)
+            elif robot.position is not None:
+                positions[robot.config.id] = robot.position.copy()
+        self.state = EvaState(tick=self.eva.rate_keeper.ticks,
+                              time=time.perf_counter(),
+                              action=action,
+                              positions=positions)
+        async with self.tick:
+            self.tick.notify_all()
+
+    # Wait for the snapshot of the next control tick
+    async def next_state(self) -> EvaState:
+        async with self.tick:
+            await self.tick.wait()
+        return self.state
+
+    # A failing service is logged, the robot keeps running
+    async def _serve(self, service):
+        try:
+            await service(self)
+        except Exception as e:
+            logger.error(f"Service {service.__name__} failed: {e}")
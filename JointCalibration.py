@@ -0,0 +1,66 @@
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from RobotPosition import POS_SUFFIX
+
+
+# Per joint zero offset (degrees) and scale factor, compiled into arrays:
+# calibrated = (raw - offset) * scale and raw = calibrated / scale + offset.
+# Built from rows [joint_name, offset, scale] like the JOINT_CALIBRATION
+# tables of the scripts. Joints without a row are passed through.
+class JointCalibration:
+    names: tuple[str]
+    offsets: np.ndarray
+    scales: np.ndarray
+
+    # names sets the joint order of the arrays, the table order by default
+    def __init__(self, table: Sequence, names: Sequence[str] = None):
+        rows = {name: (offset, scale) for name, offset, scale in table}
+        self.names = tuple(rows if names is None else names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = np.array(
+            [rows.get(name, (0.0, 1.0))[0] for name in self.names],
+            dtype=np.float64)
+        self.scales = np.array(
+            [rows.get(name, (0.0, 1.0))[1] for name in self.names],
+            dtype=np.float64)
+        self.keys = tuple(f"{name}{POS_SUFFIX}" for name in self.names)
+        self._takes = {}
+
+    # The calibration of the given joints, in their order
+    def take(self, names: tuple[str]) -> "JointCalibration":
+        calibration = self._takes.get(names)
+        if calibration is None:
+            indices = [self.index[name] for name in names]
+            calibration = JointCalibration(
+                zip(names, self.offsets[indices], self.scales[indices]),
+                names)
+            self._takes[names] = calibration
+        return calibration
+
+    def apply(self, raw: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        out = np.subtract(raw, self.offsets, out=out)
+        return np.multiply(out, self.scales, out=out)
+
+    def invert(self,
+               calibrated: np.ndarray,
+               out: np.ndarray = None) -> np.ndarray:
+        out = np.divide(calibrated, self.scales, out=out)
+        return np.add(out, self.offsets, out=out)
+
+    # Calibrated {joint: position} of an observation {"joint.pos": raw}
+    def read(self, observation: Mapping) -> dict[str, float]:
+        raw = np.fromiter((observation[key] for key in self.keys),
+                          dtype=np.float64,
+                          count=len(self.keys))
+        return dict(zip(self.names, self.apply(raw, out=raw).tolist()))
+
+    # Action {"joint.pos": raw} commanding calibrated {joint: position}
+    def action(self, positions: Mapping) -> dict[str, float]:
+        calibration = self.take(tuple(positions))
+        calibrated = np.fromiter(positions.values(),
+                                 dtype=np.float64,
+                                 count=len(positions))
+        raw = calibration.invert(calibrated, out=calibrated)
+        return dict(zip(calibration.keys, raw.tolist()))
@@ -0,0 +1,92 @@
+import numpy as np
+
+TRAPEZOID = "trapezoid"
+S_CURVE = "s_curve"
+
+
+# Time-synchronized point-to-point motion of several joints.
+# All joints follow one normalized profile s(t) from 0 to 1, so they start
+# and arrive together. The duration is the shortest one that keeps every
+# joint within its velocity and acceleration limits.
+class MotionProfile:
+    start: np.ndarray
+    goal: np.ndarray
+    duration: float
+    samples: np.ndarray
+
+    def __init__(self,
+                 start: np.ndarray,
+                 goal: np.ndarray,
+                 max_velocity,
+                 max_acceleration,
+                 dt: float,
+                 shape: str = TRAPEZOID):
+        self.start = np.asarray(start, dtype=np.float64)
+        self.goal = np.asarray(goal, dtype=np.float64)
+        self.shape = shape
+        distance = np.abs(self.goal - self.start)
+
+        # Limits of the normalized profile from the most limiting joint
+        moving = distance > 0
+        if not moving.any():
+            self.duration = 0.0
+            self.samples = self.goal[np.newaxis, :].copy()
+            return
+        velocity = np.broadcast_to(np.asarray(max_velocity, np.float64),
+                                   distance.shape)
+        acceleration = np.broadcast_to(
+            np.asarray(max_acceleration, np.float64), distance.shape)
+        v = float(np.min(velocity[moving] / distance[moving]))
+        a = float(np.min(acceleration[moving] / distance[moving]))
+
+        if shape == TRAPEZOID:
+            s = self._trapezoid(v, a)
+        elif shape == S_CURVE:
+            s = self._s_curve(v, a)
+        else:
+            raise ValueError(f"Unknown motion profile shape {shape}")
+
+        # Sample at every tick after the start, the last sample is the goal
+        steps = max(1, int(np.ceil(self.duration / dt - 1e-9)))
+        times = np.minimum(np.arange(1, steps + 1) * dt, self.duration)
+        self.samples = self.start + np.outer(s(times), self.goal - self.start)
+        self.samples[-1] = self.goal
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.samples[i]
+
+    # Accelerate at a, cruise at v, decelerate at a.
+    # Triangular when v can not be reached.
+    def _trapezoid(self, v: float, a: float):
+        if v * v / a >= 1.0:
+            ta = np.sqrt(1.0 / a)
+            v = a * ta
+            tc = 0.0
+        else:
+            ta = v / a
+            tc = (1.0 - v * ta) / v
+        self.duration = 2 * ta + tc
+        t_end = self.duration
+
+        def s(t):
+            return np.where(
+                t < ta, 0.5 * a * t**2,
+                np.where(t < ta + tc, 0.5 * a * ta**2 + v * (t - ta),
+                         1.0 - 0.5 * a * (t_end - t)**2))
+
+        return s
+
+    # Quintic (minimum jerk) time scaling: zero velocity and acceleration
+    # at both ends. Peak velocity 1.875 / T, peak acceleration 5.7735 / T^2.
+    def _s_curve(self, v: float, a: float):
+        self.duration = max(1.875 / v, np.sqrt(5.7735 / a))
+        t_end = self.duration
+
+        def s(t):
+            tau = t / t_end
+            return tau**3 * (10 - 15 * tau + 6 * tau**2)
+
+        return s
@@ -0,0 +1,161 @@
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+POS_SUFFIX = ".pos"
+
+
+# Fixed joint order of a position, shared by every position with the same keys
+class JointSchema:
+    _schemas: dict = {}
+    _motor_schemas: dict = {}
+
+    names: tuple[str]
+    index: dict[str, int]
+
+    def __init__(self, names: tuple[str]):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        # Servo names for Goal_Position writes, only "<motor>.pos" keys
+        self.pos_index = np.array(
+            [i for i, name in enumerate(names) if name.endswith(POS_SUFFIX)],
+            dtype=np.intp)
+        self.motors = tuple(names[i].removesuffix(POS_SUFFIX)
+                            for i in self.pos_index)
+        self._takes = {}
+
+    @classmethod
+    def get(cls, names: tuple[str]) -> "JointSchema":
+        schema = cls._schemas.get(names)
+        if schema is None:
+            schema = cls._schemas[names] = JointSchema(names)
+        return schema
+
+    @classmethod
+    def from_motors(cls, motors: tuple[str]) -> "JointSchema":
+        schema = cls._motor_schemas.get(motors)
+        if schema is None:
+            schema = cls.get(tuple(f"{motor}{POS_SUFFIX}" for motor in motors))
+            cls._motor_schemas[motors] = schema
+        return schema
+
+    # Indices of the other schema's joints in this schema
+    def take(self, other: "JointSchema") -> np.ndarray:
+        indices = self._takes.get(other)
+        if indices is None:
+            indices = np.array([self.index[name] for name in other.names],
+                               dtype=np.intp)
+            self._takes[other] = indices
+        return indices
+
+
+# Joint positions backed by a float array in a fixed joint order.
+# Behaves like dict[str, float] for existing callers.
+class RobotPosition(MutableMapping):
+    __slots__ = ("schema", "values")
+    __hash__ = None
+
+    schema: JointSchema
+    values: np.ndarray
+
+    def __init__(self, position: Mapping = None):
+        position = {} if position is None else position
+        if isinstance(position, RobotPosition):
+            self.schema = position.schema
+            self.values = position.values.copy()
+        else:
+            self.schema = JointSchema.get(tuple(position))
+            self.values = np.fromiter(position.values(),
+                                      dtype=np.float64,
+                                      count=len(position))
+
+    @classmethod
+    def from_values(cls, schema: JointSchema,
+                    values: np.ndarray) -> "RobotPosition":
+        position = cls.__new__(cls)
+        position.schema = schema
+        position.values = values
+        return position
+
+    # Build a position from a sync_read result {motor: value}
+    @classmethod
+    def from_motors(cls, values: dict[str, float]) -> "RobotPosition":
+        return cls.from_values(
+            JointSchema.from_motors(tuple(values)),
+            np.fromiter(values.values(), dtype=np.float64,
+                        count=len(values)))
+
+    def __getitem__(self, key: str) -> float:
+        return float(self.values[self.schema.index[key]])
+
+    def __setitem__(self, key: str, value: float):
+        i = self.schema.index.get(key)
+        if i is None:
+            self.schema = JointSchema.get(self.schema.names + (key, ))
+            self.values = np.append(self.values, value)
+        else:
+            self.values[i] = value
+
+    def __delitem__(self, key: str):
+        i = self.schema.index[key]
+        self.schema = JointSchema.get(self.schema.names[:i] +
+                                      self.schema.names[i + 1:])
+        self.values = np.delete(self.values, i)
+
+    def __iter__(self):
+        return iter(self.schema.names)
+
+    def __len__(self) -> int:
+        return len(self.schema.names)
+
+    def __contains__(self, key) -> bool:
+        return key in self.schema.index
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RobotPosition) and other.schema is self.schema:
+            return bool(np.array_equal(self.values, other.values))
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"RobotPosition({dict(self.items())})"
+
+    def __str__(self):
+        return str("\n" + "\t\n".join(f"{k}: {v:.1f}"
+                                      for k, v in self.items()) + "\n")
+
+    def copy(self) -> "RobotPosition":
+        return RobotPosition.from_values(self.schema, self.values.copy())
+
+    __copy__ = copy
+
+    # Copy the values of a position with the same schema, no allocation
+    def assign(self, other: "RobotPosition"):
+        np.copyto(self.values, other.values)
+
+    # Goal_Position values keyed by motor name
+    def motor_dict(self) -> dict[str, float]:
+        values = self.values[self.schema.pos_index].tolist()
+        return dict(zip(self.schema.motors, values))
+
+    # Values of the target's joints, in the target's order
+    def take(self, target: "RobotPosition") -> np.ndarray:
+        if target.schema is self.schema:
+            return self.values
+        return self.values[self.schema.take(target.schema)]
+
+    # target - self for every joint of the target
+    def error(self, target: "RobotPosition") -> np.ndarray:
+        return target.values - self.take(target)
+
+    # Move every joint of the target by at most max_step towards it, in place
+    def move_towards(self, target: "RobotPosition", max_step: float):
+        delta = np.clip(self.error(target), -max_step, max_step)
+        if target.schema is self.schema:
+            self.values += delta
+        else:
+            self.values[self.schema.take(target.schema)] += delta
+
+    def clip(self, low, high):
+        np.clip(self.values, low, high, out=self.values)
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import os
+import time
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+import numpy as np
+
+from BusRegistry import BusRegistry, feetech_bus
+from constants import EvaRobotConfig, RETURN_KEY
+from RobotPosition import JointSchema, RobotPosition
+from utils import get_custom_logger, RateKeeper
+
+logger = get_custom_logger()
+
+SEQ_SIZE = 8
+
+
+# A float64 array in shared memory guarded by a seqlock, for one writer
+# process and any number of readers. The writer makes the sequence number
+# odd, writes and makes it even again; a reader copies the values and
+# retries if the sequence number was odd or changed meanwhile. Neither side
+# ever waits for the other to release a lock.
+class SeqLockArray:
+    shm: SharedMemory
+    seq: np.ndarray
+    values: np.ndarray
+
+    # Create a new array, or attach to the one called name
+    def __init__(self, shape: tuple[int], name: str = None):
+        self.shape = tuple(shape)
+        size = SEQ_SIZE + int(np.prod(self.shape)) * 8
+        if name is None:
+            self.shm = SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            # Children started by multiprocessing share the creator's
+            # resource tracker, only the creator unlinks the memory
+            self.shm = SharedMemory(name=name)
+            self.owner = False
+        self.seq = np.ndarray((1, ), dtype=np.uint64, buffer=self.shm.buf)
+        self.values = np.ndarray(self.shape,
+                                 dtype=np.float64,
+                                 buffer=self.shm.buf,
+                                 offset=SEQ_SIZE)
+        if self.owner:
+            self.seq[0] = 0
+            self.values[:] = np.nan
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # Number of writes so far
+    @property
+    def version(self) -> int:
+        return int(self.seq[0]) // 2
+
+    def write(self, values: np.ndarray):
+        self.seq[0] += 1
+        self.values[:] = values
+        self.seq[0] += 1
+
+    # Copy a consistent snapshot into out, returns its version
+    def read(self, out: np.ndarray) -> int:
+        while True:
+            seq = int(self.seq[0])
+            if seq & 1:
+                continue
+            out[:] = self.values
+            if int(self.seq[0]) == seq:
+                return seq // 2
+
+    def close(self):
+        # Views into the buffer must go before it can be closed
+        self.seq = None
+        self.values = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Servo loop of the child process: step the limbs towards the targets of
+# the UI process and publish their positions, until stop is set
+def serve(configs: list[EvaRobotConfig], bus_factory, targets_name: str,
+          state_name: str, stop, ready, cpu: int, cache_dir: Path):
+    from EvaArm import EvaArm
+    from EvaFoot import EvaFoot
+    left_arm_config, right_arm_config, foot_config = configs
+
+    if cpu is not None:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {cpu})
+        else:
+            logger.warning("Pinning the servo process is not supported here")
+
+    n_joints = sum(len(config.motors) for config in configs)
+    targets = SeqLockArray((n_joints, ), targets_name)
+    state = SeqLockArray((n_joints, ), state_name)
+    registry = BusRegistry(configs, bus_factory, cache_dir)
+    registry.connect()
+    left_arm = EvaArm(left_arm_config, registry.get_bus(left_arm_config))
+    right_arm = EvaArm(right_arm_config, registry.get_bus(right_arm_config))
+    foot = EvaFoot(foot_config, registry.get_bus(foot_config))
+    robots = [left_arm, right_arm, foot]
+    slices = limb_slices(configs)
+    schemas = [
+        JointSchema.from_motors(tuple(config.motors)) for config in configs
+    ]
+    target = np.full(n_joints, np.nan)
+    applied = np.full(n_joints, np.nan)
+    present = np.full(n_joints, np.nan)
+    seen = 0
+    # Publish the start positions before the UI sends targets
+    registry.begin_tick()
+    for robot, limb in zip(robots, slices):
+        present[limb] = robot.get_current_position().values
+    registry.end_tick()
+    state.write(present)
+    rate_keeper = RateKeeper(configs[0].control_interval)
+    # Nothing allocated so far needs collecting, keep it out of the GC
+    gc.freeze()
+    ready.set()
+    try:
+        while not stop.is_set():
+            registry.begin_tick()
+            version = targets.read(target)
+            if version != seen:
+                seen = version
+                for robot, limb, schema in zip(robots, slices, schemas):
+                    # New targets for the joints the UI changed
+                    changed = (target[limb] != applied[limb]) & ~np.isnan(
+                        target[limb])
+                    if changed.any():
+                        robot.set_target(
+                            RobotPosition({
+                                schema.names[i]: target[limb][i]
+                                for i in np.flatnonzero(changed)
+                            }))
+                applied[:] = target
+            for robot, limb in zip(robots, slices):
+                robot.step()
+                present[limb] = robot.get_cached_position().values
+            registry.end_tick()
+            state.write(present)
+            rate_keeper.wait()
+        logger.info("Servo loop stats: %s", rate_keeper)
+        # Move back to the default position before disconnect, like Eva
+        left_arm.move_to_default_position()
+        right_arm.move_to_default_position()
+    finally:
+        for robot in robots:
+            robot.disconnect()
+        targets.close()
+        state.close()
+
+
+# Joint slice of every limb in the shared arrays
+def limb_slices(configs: list[EvaRobotConfig]) -> list[slice]:
+    slices = []
+    start = 0
+    for config in configs:
+        slices.append(slice(start, start + len(config.motors)))
+        start += len(config.motors)
+    return slices
+
+
+# Runs the servo loop (bus I/O and limb control) in a dedicated process, so
+# the keyboard, logging and the GC of the UI process do not add jitter.
+# Targets go to the servo process and positions come back through
+# SeqLockArrays in shared memory, the servo process is pinned to cpu if set.
+# Mirrors Eva: a key press targets its servo at the present position plus
+# the key's delta times the limb's speed, the servo process interpolates
+# towards it.
+class ServoProcess:
+    configs: list[EvaRobotConfig]
+    targets: SeqLockArray
+    state: SeqLockArray
+    process: multiprocessing.Process
+
+    # start_method of the servo process, spawn does not inherit the
+    # threads and open devices of the UI process
+    # calibration_cache_dir of the servo process, see CalibrationCache
+    def __init__(self,
+                 left_arm_config: EvaRobotConfig,
+                 right_arm_config: EvaRobotConfig,
+                 foot_config: EvaRobotConfig,
+                 bus_factory=feetech_bus,
+                 cpu: int = None,
+                 start_method: str = "spawn",
+                 calibration_cache_dir: Path = None):
+        self.configs = [left_arm_config, right_arm_config, foot_config]
+        self.slices = limb_slices(self.configs)
+        self.schemas = [
+            JointSchema.from_motors(tuple(config.motors))
+            for config in self.configs
+        ]
+        self.key_index = {}
+        for limb, (config, schema) in enumerate(zip(self.configs,
+                                                    self.schemas)):
+            for key, (servo_name, delta) in config.robot_controls.items():
+                if key == RETURN_KEY or key in self.key_index:
+                    raise ValueError(f"Key '{key}' of {config.id} is "
+                                     f"already bound")
+                self.key_index[key] = (
+                    self.slices[limb].start + schema.index[servo_name],
+                    delta * config.speed)
+        self.control_interval = self.configs[0].control_interval
+
+        n_joints = self.slices[-1].stop
+        self.targets = SeqLockArray((n_joints, ))
+        self.state = SeqLockArray((n_joints, ))
+        self.target = np.full(n_joints, np.nan)
+        self.present = np.full(n_joints, np.nan)
+        context = multiprocessing.get_context(start_method)
+        self.stop_event = context.Event()
+        self.ready = context.Event()
+        self.process = context.Process(
+            target=serve,
+            args=(self.configs, bus_factory, self.targets.name,
+                  self.state.name, self.stop_event, self.ready, cpu,
+                  calibration_cache_dir),
+            name="ServoProcess",
+            daemon=True)
+
+    # Start the servo process, wait until its buses are open
+    def start(self, timeout: float = 60.0):
+        self.process.start()
+        deadline = time.perf_counter() + timeout
+        while not self.ready.wait(0.1):
+            if not self.process.is_alive() or \
+                    time.perf_counter() > deadline:
+                self.stop()
+                raise RuntimeError("Servo process failed to start")
+        logger.info(f"Servo process {self.process.pid} running")
+
+    # Latest positions {limb id: RobotPosition} published by the servo loop
+    def get_positions(self) -> dict[str, RobotPosition]:
+        self.state.read(self.present)
+        return {
+            config.id: RobotPosition.from_values(schema,
+                                                 self.present[limb].copy())
+            for config, schema, limb in zip(self.configs, self.schemas,
+                                            self.slices)
+        }
+
+    # Target the servos of the keys in an input action, the deltas of all
+    # keys in the batch are summed per servo, see Eva.apply_action
+    def apply_action(self, action: dict):
+        deltas = {}
+        for key, amount in action.items():
+            binding = self.key_index.get(key)
+            if binding is None or amount == 0:
+                continue
+            joint, delta = binding
+            if amount is not None:
+                delta *= amount
+            deltas[joint] = deltas.get(joint, 0) + delta
+        if not deltas:
+            return
+        self.state.read(self.present)
+        for joint, delta in deltas.items():
+            self.target[joint] = self.present[joint] + delta
+        self.targets.write(self.target)
+
+    # Input loop of the UI process, until the return key
+    def run(self, input):
+        logger.info(f"Eva running with a servo process...")
+        rate_keeper = RateKeeper(self.control_interval)
+        while self.process.is_alive():
+            action = input.get_action()
+            if RETURN_KEY in action:
+                break
+            self.apply_action(action)
+            rate_keeper.wait()
+        logger.info("Input loop stats: %s", rate_keeper)
+
+    # Stop the servo loop, the limbs move back to their default positions
+    def stop(self, timeout: float = 10.0):
+        self.stop_event.set()
+        if self.process.pid is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                logger.warning("Servo process did not stop, terminating it")
+                self.process.terminate()
+                self.process.join()
+        self.targets.close()
+        self.state.close()
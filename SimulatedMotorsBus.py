@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+from lerobot.utils.errors import DeviceAlreadyConnectedError, DeviceNotConnectedError
+
+if TYPE_CHECKING:
+    from lerobot.motors import Motor, MotorCalibration
+
+# Data lengths (bytes) of the simulated registers
+REGISTER_LENGTHS = {
+    "Goal_Position": 2,
+    "Present_Position": 2,
+    "Present_Velocity": 2,
+    "Present_Load": 2,
+}
+# Ping packets of the connect handshake, per motor
+PING_BYTES = 6 + 8
+# Calibration registers read per motor: homing offset, min and max limit
+CALIBRATION_REGISTERS = 3
+# Header, id, length, instruction, address, data length and checksum
+PACKET_OVERHEAD = 8
+# Status packet per motor without data
+STATUS_OVERHEAD = 6
+
+
+# Stand-in for FeetechMotorsBus without hardware.
+# Every sts3215 servo moves towards its goal at max_velocity (deg/s) in
+# real time. Every transaction costs latency plus byte_time per byte on the
+# wire, spent sleeping like a blocking serial call would.
+class SimulatedMotorsBus:
+    port: str
+    motors: dict[str, Motor]
+
+    def __init__(self,
+                 port: str,
+                 motors: dict[str, Motor],
+                 calibration: dict[str, MotorCalibration] = None,
+                 *,
+                 max_velocity: float = 300.0,
+                 latency: float = 0.0005,
+                 byte_time: float = 10e-6,
+                 initial_positions: dict[str, float] = None):
+        self.port = port
+        self.motors = motors
+        self.calibration = calibration if calibration else {}
+        # The simulated motors hold the calibration they are created with
+        self.motor_calibration = dict(self.calibration)
+        self.max_velocity = max_velocity
+        self.latency = latency
+        self.byte_time = byte_time
+
+        self.names = list(motors)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        initial_positions = initial_positions or {}
+        self.position = np.array(
+            [initial_positions.get(name, 0.0) for name in self.names],
+            dtype=np.float64)
+        self.goal = self.position.copy()
+        self.velocity = np.zeros(len(self.names))
+        self.last_update = time.perf_counter()
+
+        self.connected = False
+        self.transactions = 0
+        self.reads = 0
+        self.writes = 0
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.motors)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def connect(self, handshake: bool = True):
+        if self.connected:
+            raise DeviceAlreadyConnectedError(
+                f"{self.port} is already connected.")
+        self.connected = True
+        if handshake:
+            for _ in self.motors:
+                self._transfer(PING_BYTES)
+        self.last_update = time.perf_counter()
+
+    def disconnect(self, disable_torque: bool = True):
+        self._assert_connected()
+        self.connected = False
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.reads = 0
+        self.writes = 0
+        self.bytes = 0
+
+    def _assert_connected(self):
+        if not self.connected:
+            raise DeviceNotConnectedError(f"{self.port} is not connected.")
+
+    # Move every servo towards its goal for the time since the last update
+    def _update(self):
+        now = time.perf_counter()
+        dt = now - self.last_update
+        self.last_update = now
+        if dt <= 0:
+            return
+        step = np.clip(self.goal - self.position, -self.max_velocity * dt,
+                       self.max_velocity * dt)
+        self.position += step
+        self.velocity = step / dt
+
+    # Spend the time of one transaction on the wire
+    def _transfer(self, n_bytes: int):
+        self.transactions += 1
+        self.bytes += n_bytes
+        delay = self.latency + n_bytes * self.byte_time
+        if delay > 0:
+            time.sleep(delay)
+
+    def _names(self, motors) -> list[str]:
+        if motors is None:
+            return self.names
+        if isinstance(motors, str):
+            return [motors]
+        return list(motors)
+
+    def _register(self, data_name: str) -> np.ndarray:
+        if data_name == "Present_Position":
+            return self.position
+        if data_name == "Goal_Position":
+            return self.goal
+        if data_name == "Present_Velocity":
+            return self.velocity
+        if data_name == "Present_Load":
+            return np.zeros(len(self.names))
+        raise KeyError(f"{data_name} is not simulated")
+
+    def sync_read(self,
+                  data_name: str,
+                  motors: str | list[str] = None,
+                  *,
+                  normalize: bool = True,
+                  num_retry: int = 0) -> dict[str, float]:
+        self._assert_connected()
+        names = self._names(motors)
+        length = REGISTER_LENGTHS[data_name]
+        self._transfer(PACKET_OVERHEAD + len(names) + len(names) *
+                       (STATUS_OVERHEAD + length))
+        self.reads += 1
+        self._update()
+        values = self._register(data_name)
+        return {name: float(values[self.index[name]]) for name in names}
+
+    def sync_write(self,
+                   data_name: str,
+                   values: float | dict[str, float],
+                   *,
+                   normalize: bool = True,
+                   num_retry: int = 0):
+        self._assert_connected()
+        if not isinstance(values, dict):
+            values = {name: values for name in self.names}
+        if data_name != "Goal_Position":
+            raise KeyError(f"{data_name} can not be written")
+        length = REGISTER_LENGTHS[data_name]
+        self._transfer(PACKET_OVERHEAD + len(values) * (1 + length))
+        self.writes += 1
+        self._update()
+        for name, value in values.items():
+            self.goal[self.index[name]] = value
+
+    @property
+    def is_calibrated(self) -> bool:
+        return self.read_calibration() == self.calibration
+
+    def read_calibration(self) -> dict[str, MotorCalibration]:
+        self._assert_connected()
+        for _ in range(CALIBRATION_REGISTERS * len(self.motors)):
+            self._transfer(PACKET_OVERHEAD + STATUS_OVERHEAD + 2)
+        return dict(self.motor_calibration)
+
+    def write_calibration(self,
+                          calibration_dict: dict[str, MotorCalibration],
+                          cache: bool = True):
+        self._assert_connected()
+        for _ in range(CALIBRATION_REGISTERS * len(calibration_dict)):
+            self._transfer(PACKET_OVERHEAD + 3)
+        self.motor_calibration = dict(calibration_dict)
+        if cache:
+            self.calibration = calibration_dict
+
+    def read(self, data_name: str, motor: str, **kwargs) -> float:
+        return self.sync_read(data_name, [motor], **kwargs)[motor]
+
+    def write(self, data_name: str, motor: str, value: float, **kwargs):
+        return self.sync_write(data_name, {motor: value}, **kwargs)
+
+
+# SO100Follower interface on top of a SimulatedMotorsBus, for the scripts
+class SimulatedFollower:
+    bus: SimulatedMotorsBus
+
+    def __init__(self, bus: SimulatedMotorsBus):
+        self.bus = bus
+
+    @property
+    def is_connected(self) -> bool:
+        return self.bus.is_connected
+
+    def connect(self, calibrate: bool = True):
+        self.bus.connect()
+
+    def disconnect(self):
+        self.bus.disconnect()
+
+    def calibrate(self):
+        pass
+
+    def get_observation(self) -> dict[str, float]:
+        obs = self.bus.sync_read("Present_Position")
+        return {f"{motor}.pos": val for motor, val in obs.items()}
+
+    def send_action(self, action: dict[str, float]) -> dict[str, float]:
+        goal_pos = {
+            key.removesuffix(".pos"): val
+            for key, val in action.items() if key.endswith(".pos")
+        }
+        self.bus.sync_write("Goal_Position", goal_pos)
+        return {f"{motor}.pos": val for motor, val in goal_pos.items()}
@@ -0,0 +1,186 @@
+import json
+import mmap
+import time
+from pathlib import Path
+
+import numpy as np
+
+from RobotPosition import JointSchema, RobotPosition
+
+MAGIC = b"EVATLM01"
+HEADER_SIZE = 4096
+MAX_JOINTS = 8
+
+# Record kinds
+PRESENT = 0
+GOAL = 1
+
+# Fixed file header, the joint names of every limb follow as JSON
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("capacity", "<u8"),
+    ("count", "<u8"),
+    ("start_time", "<f8"),
+    ("names_size", "<u4"),
+])
+
+# One record per read or write of a limb, unused joints are NaN
+RECORD = np.dtype([
+    ("time", "<f8"),
+    ("kind", "u1"),
+    ("limb", "u1"),
+    ("joints", "u1"),
+    ("values", "<f8", (MAX_JOINTS, )),
+])
+
+
+# Append present and goal positions of every limb to a memory-mapped ring
+# file. The file is preallocated and every record has the same layout, a
+# record is written straight into the mapped arrays.
+class TelemetryRecorder:
+    path: Path
+    capacity: int
+    limbs: list[JointSchema]
+
+    def __init__(self, path: Path, capacity: int = 1 << 18):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.limbs = []
+        self.limb_names = []
+        self.count = 0
+
+        size = HEADER_SIZE + capacity * RECORD.itemsize
+        with open(self.path, "wb") as f:
+            f.truncate(size)
+        self.file = open(self.path, "r+b")
+        self.mmap = mmap.mmap(self.file.fileno(), size)
+        self.header = np.frombuffer(self.mmap, HEADER, 1)[0:1]
+        self.header["magic"] = MAGIC
+        self.header["capacity"] = capacity
+        self.header["start_time"] = time.time()
+        records = np.frombuffer(self.mmap, RECORD, capacity, HEADER_SIZE)
+        self.times = records["time"]
+        self.kinds = records["kind"]
+        self.limb_ids = records["limb"]
+        self.joints = records["joints"]
+        self.values = records["values"]
+        self.perf_start = time.perf_counter()
+
+    # Register a limb with its joint order, return its id for record()
+    def add_limb(self, name: str, joint_names: tuple[str]) -> int:
+        if len(joint_names) > MAX_JOINTS:
+            raise ValueError(f"{name} has more than {MAX_JOINTS} joints")
+        self.limbs.append(JointSchema.get(tuple(joint_names)))
+        self.limb_names.append(name)
+        names = json.dumps({
+            "limbs": self.limb_names,
+            "joints": [list(schema.names) for schema in self.limbs],
+        }).encode()
+        if HEADER.itemsize + len(names) > HEADER_SIZE:
+            raise ValueError("Too many limbs for the telemetry header")
+        self.mmap[HEADER.itemsize:HEADER.itemsize + len(names)] = names
+        self.header["names_size"] = len(names)
+        return len(self.limbs) - 1
+
+    def record(self, limb: int, kind: int, position: RobotPosition):
+        i = self.count % self.capacity
+        schema = self.limbs[limb]
+        n = len(schema.names)
+        self.times[i] = time.perf_counter() - self.perf_start
+        self.kinds[i] = kind
+        self.limb_ids[i] = limb
+        self.joints[i] = n
+        if position.schema is schema:
+            self.values[i, :n] = position.values
+        else:
+            self.values[i, :n] = np.nan
+            self.values[i, schema.take(position.schema)] = position.values
+        self.count += 1
+        self.header["count"] = self.count
+
+    def close(self):
+        if self.mmap is None:
+            return
+        self.header = self.times = self.kinds = self.limb_ids = None
+        self.joints = self.values = None
+        self.mmap.flush()
+        self.mmap.close()
+        self.file.close()
+        self.mmap = None
+
+
+# A recorded session as NumPy arrays in chronological order
+class Telemetry:
+    limbs: list[str]
+    joints: list[list[str]]
+    start_time: float
+    time: np.ndarray
+    kind: np.ndarray
+    limb: np.ndarray
+    values: np.ndarray
+
+    def __init__(self, limbs, joints, start_time, records: np.ndarray):
+        self.limbs = limbs
+        self.joints = joints
+        self.start_time = start_time
+        self.time = records["time"]
+        self.kind = records["kind"]
+        self.limb = records["limb"]
+        self.values = records["values"]
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    # Times and values of one limb's present or goal positions
+    def select(self, limb: str, kind: int) -> tuple[np.ndarray, np.ndarray]:
+        limb_id = self.limbs.index(limb)
+        mask = (self.limb == limb_id) & (self.kind == kind)
+        return self.time[mask], self.values[mask, :len(self.joints[limb_id])]
+
+
+def read_header(path: Path) -> tuple[dict, dict]:
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    header = np.frombuffer(data, HEADER, 1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError(f"{path} is not an Eva telemetry file")
+    size = int(header["names_size"])
+    names = json.loads(data[HEADER.itemsize:HEADER.itemsize + size] or "{}")
+    return header, names
+
+
+# Load a whole session in one read, unrolling the ring
+def load_telemetry(path: Path) -> Telemetry:
+    header, names = read_header(path)
+    capacity, count = int(header["capacity"]), int(header["count"])
+    records = np.fromfile(path,
+                          RECORD,
+                          count=min(count, capacity),
+                          offset=HEADER_SIZE)
+    if count > capacity:
+        records = np.roll(records, -(count % capacity))
+    return Telemetry(names.get("limbs", []), names.get("joints", []),
+                     float(header["start_time"]), records)
+
+
+# Stream a session from disk in chronological chunks of records, without
+# loading it into memory
+def iter_telemetry(path: Path, chunk_size: int = 4096):
+    header, _ = read_header(path)
+    capacity, count = int(header["capacity"]), int(header["count"])
+    if count == 0:
+        return
+    records = np.memmap(path,
+                        RECORD,
+                        mode="r",
+                        offset=HEADER_SIZE,
+                        shape=(capacity, ))
+    if count > capacity:
+        # The oldest record follows the newest one in the ring
+        wrap = count % capacity
+        segments = ((wrap, capacity), (0, wrap))
+    else:
+        segments = ((0, count), )
+    for start, stop in segments:
+        for i in range(start, stop, chunk_size):
+            yield np.array(records[i:min(i + chunk_size, stop)])
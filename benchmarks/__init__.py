@@ -0,0 +1,30 @@
+"""Benchmarks, run as modules from the repository root"""
+
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=ROOT,
+                              capture_output=True,
+                              text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    for name, result in results["benchmarks"].items():
+        old = previous.get("benchmarks", {}).get(name)
+        if not old:
+            continue
+        print(f"{name} vs {previous.get('commit')}:")
+        for key, value in result.items():
+            before = old.get(key)
+            if isinstance(value, (int, float)) and before:
+                change = (value - before) / before * 100
+                print(f"  {key}: {before:.4g} -> {value:.4g} ({change:+.1f}%)")
@@ -0,0 +1,321 @@
+"""
+Control loop benchmarks on simulated buses
+
+Runs EvaRobot.move_to_position_in_loop, Eva.run, Eva.replay and the
+dual-arm ArmController.p_control_loop against SimulatedMotorsBus and
+reports ticks per second, per-tick latency p50/p99, time to converge, bus
+transactions per tick and bytes allocated per tick. Results are saved as
+JSON, pass a previous result file with --compare to see the change between
+commits.
+
+Usage (from the repository root):
+    python -m benchmarks.control_loops --output bench.json
+    python -m benchmarks.control_loops --compare bench.json
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from ArmController import ArmController
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       SHOULDER_PAN, ELBOW_FLEX, RobotPosition)
+from Eva import Eva
+from EvaInput import ScriptedInput
+from EvaRobot import EvaRobot
+from SimulatedMotorsBus import SimulatedMotorsBus, SimulatedFollower
+from Telemetry import TelemetryRecorder
+from utils import get_custom_logger
+from benchmarks import ROOT, compare, git_commit
+
+
+class TickRecorder:
+    """Per-tick latency and, optionally, bytes allocated per tick"""
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.latencies = []
+        self.allocations = []
+        self.tick_start = None
+        self.first_tick = None
+        self.last_tick = None
+
+    def begin(self):
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+        self.tick_start = time.perf_counter()
+        if self.first_tick is None:
+            self.first_tick = self.tick_start
+
+    def end(self):
+        if self.tick_start is None:
+            return
+        self.last_tick = time.perf_counter()
+        self.latencies.append(self.last_tick - self.tick_start)
+        self.tick_start = None
+        if self.trace_allocations:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.allocations.append(peak - self.memory_start)
+
+
+class RecordedInput(ScriptedInput):
+    """Scripted input that begins a recorder tick per scripted action"""
+
+    def __init__(self, actions, recorder, final=None):
+        super().__init__(actions, final)
+        self.recorder = recorder
+
+    def get_action(self):
+        if self.actions:
+            self.recorder.begin()
+        return super().get_action()
+
+
+def load_script(name):
+    """Import a script whose file name is not a valid module name"""
+    spec = importlib.util.spec_from_file_location(name.removesuffix(".py"),
+                                                  ROOT / name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_bus(config, **kwargs):
+    bus = SimulatedMotorsBus(config.port, config.motors, **kwargs)
+    bus.connect(handshake=False)
+    return bus
+
+
+def bench_robot_move(recorder):
+    """One long move of a single arm with move_to_position_in_loop"""
+    bus = make_bus(LEFT_ARM_CONFIG)
+    robot = EvaRobot(LEFT_ARM_CONFIG, bus)
+    target = RobotPosition({SHOULDER_PAN: 90, ELBOW_FLEX: -45})
+
+    step = robot.step
+
+    def timed_step():
+        recorder.begin()
+        try:
+            return step()
+        finally:
+            recorder.end()
+
+    robot.step = timed_step
+    bus.reset_counters()
+    start = time.perf_counter()
+    robot.move_to_position_in_loop(target)
+    transactions = bus.transactions
+
+    # The servos may still be catching up with the last command
+    index = [bus.index[name.removesuffix(".pos")] for name in target]
+    while np.max(np.abs(bus.position[index] - target.values)) > \
+            LEFT_ARM_CONFIG.error:
+        time.sleep(0.001)
+        bus._update()
+    return {
+        "time_to_converge_s": time.perf_counter() - start,
+        "transactions": transactions,
+    }
+
+
+def bench_eva_run(recorder, ticks=100):
+    """Eva.run on three limbs with keys held on every limb"""
+    keys = {'1': 1, 'a': 1, '7': 1}
+    keyboard = RecordedInput([keys] * ticks, recorder)
+    with tempfile.TemporaryDirectory() as tmp:
+        eva = Eva(LEFT_ARM_CONFIG,
+                  RIGHT_ARM_CONFIG,
+                  FOOT_CONFIG,
+                  bus_factory=SimulatedMotorsBus,
+                  keyboard=keyboard,
+                  calibration_cache_dir=Path(tmp))
+        buses = [shared.bus for shared in eva.bus_registry.buses.values()]
+        for bus in buses:
+            bus.reset_counters()
+
+        wait = eva.rate_keeper.wait
+
+        def timed_wait():
+            recorder.end()
+            return wait()
+
+        eva.rate_keeper.wait = timed_wait
+        eva.run()
+    transactions = sum(bus.transactions for bus in buses)
+    return {
+        "achieved_hz": eva.rate_keeper.achieved_hz,
+        "overruns": eva.rate_keeper.overruns,
+        "transactions": transactions,
+    }
+
+
+def bench_eva_replay(recorder, ticks=100, speed=4):
+    """Eva.replay of a recorded Eva.run session at 4x speed"""
+    keys = {'1': 1, 'a': 1, '7': 1}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "session.bin"
+        eva = Eva(LEFT_ARM_CONFIG,
+                  RIGHT_ARM_CONFIG,
+                  FOOT_CONFIG,
+                  bus_factory=SimulatedMotorsBus,
+                  keyboard=ScriptedInput([keys] * ticks),
+                  telemetry=TelemetryRecorder(path),
+                  calibration_cache_dir=Path(tmp))
+        eva.run()
+        eva.telemetry.close()
+
+        eva = Eva(LEFT_ARM_CONFIG,
+                  RIGHT_ARM_CONFIG,
+                  FOOT_CONFIG,
+                  bus_factory=SimulatedMotorsBus,
+                  keyboard=ScriptedInput([]),
+                  calibration_cache_dir=Path(tmp))
+        buses = [shared.bus for shared in eva.bus_registry.buses.values()]
+        for bus in buses:
+            bus.reset_counters()
+        wait = eva.rate_keeper.wait
+
+        def timed_wait():
+            recorder.end()
+            result = wait()
+            recorder.begin()
+            return result
+
+        eva.rate_keeper.wait = timed_wait
+        recorder.begin()
+        eva.replay(path, speed)
+        recorder.end()
+    return {
+        "achieved_hz": eva.rate_keeper.achieved_hz,
+        "overruns": eva.rate_keeper.overruns,
+        "transactions": sum(bus.transactions for bus in buses),
+    }
+
+
+def bench_p_control_loop(recorder, ticks=100):
+    """Dual-arm ArmController.p_control_loop of the end effector script"""
+    script = load_script("2_dual_so100_keyboard_ee_control.py")
+    robots = {
+        'arm1': SimulatedFollower(make_bus(LEFT_ARM_CONFIG)),
+        'arm2': SimulatedFollower(make_bus(RIGHT_ARM_CONFIG)),
+    }
+    controller: ArmController = script.make_controller(robots)
+    controller.target[:, controller.joints.index('shoulder_pan')] = [30, -30]
+
+    # Converged once the commands settle and the servos reached them
+    converged = {}
+    start = time.perf_counter()
+    send_action = robots['arm2'].send_action
+    last_goals = [None]
+
+    def timed_send_action(action):
+        result = send_action(action)
+        if recorder.tick_start is None:
+            # Returning to the start position after the loop
+            return result
+        recorder.end()
+        goals = np.concatenate([robot.bus.goal for robot in robots.values()])
+        positions = np.concatenate(
+            [robot.bus.position for robot in robots.values()])
+        if ("time" not in converged and last_goals[0] is not None
+                and np.max(np.abs(goals - last_goals[0])) < 0.1
+                and np.max(np.abs(goals - positions)) < 1.0):
+            converged["time"] = time.perf_counter() - start
+        last_goals[0] = goals
+        converged["transactions"] = sum(robot.bus.transactions
+                                        for robot in robots.values())
+        return result
+
+    robots['arm2'].send_action = timed_send_action
+    keyboard = RecordedInput([{}] * ticks, recorder, final={'x': None})
+    controller.p_control_loop(keyboard, kp=0.5)
+    controller.close()
+    # Transactions of the return to the start position are not counted
+    return {
+        "time_to_converge_s": converged.get("time"),
+        "transactions": converged["transactions"],
+    }
+
+
+BENCHMARKS = {
+    "robot_move": bench_robot_move,
+    "eva_run": bench_eva_run,
+    "eva_replay": bench_eva_replay,
+    "dual_p_control_loop": bench_p_control_loop,
+}
+
+
+def run_benchmark(name):
+    bench = BENCHMARKS[name]
+
+    recorder = TickRecorder()
+    result = bench(recorder)
+    latencies = np.array(recorder.latencies)
+    n_ticks = len(latencies)
+    transactions = result.pop("transactions", None)
+    elapsed = (recorder.last_tick or 0) - (recorder.first_tick or 0)
+    result.update({
+        "ticks": n_ticks,
+        "ticks_per_s": n_ticks / elapsed if elapsed > 0 else 0.0,
+        # Rate the loop could reach if it never slept
+        "max_ticks_per_s": 1 / latencies.mean() if n_ticks else 0.0,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+    })
+    if transactions is not None and n_ticks:
+        result["transactions_per_tick"] = transactions / n_ticks
+
+    # Allocations are traced in a second run, tracing skews the timing
+    recorder = TickRecorder(trace_allocations=True)
+    tracemalloc.start()
+    try:
+        bench(recorder)
+    finally:
+        tracemalloc.stop()
+    result["alloc_bytes_per_tick"] = float(np.mean(recorder.allocations))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", type=Path, help="Save results as JSON")
+    parser.add_argument("--compare",
+                        type=Path,
+                        help="Previous JSON results to compare against")
+    parser.add_argument("--only",
+                        nargs="+",
+                        choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    args = parser.parse_args()
+    get_custom_logger().setLevel(logging.WARNING)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "benchmarks": {},
+    }
+    for name in args.only:
+        results["benchmarks"][name] = run_benchmark(name)
+        print(f"{name}: {json.dumps(results['benchmarks'][name], indent=2)}")
+
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Startup benchmarks
+
+Imports each module in a fresh interpreter under `python -X importtime`
+and reports the cumulative import time of the module, the import time of
+the heaviest dependencies (lerobot, torch, numpy) when they were loaded,
+and the wall time of the whole interpreter. Each import runs --repeat
+times and the fastest run is kept. Results are saved as JSON, pass a
+previous result file with --compare to see the change between commits.
+
+Usage (from the repository root):
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --compare startup.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import ROOT, compare, git_commit
+
+MODULES = [
+    "constants",
+    "RobotPosition",
+    "main",
+    "Eva",
+    "EvaRobot",
+]
+# Dependencies reported separately, if the module imported them
+HEAVY = ["lerobot", "torch", "numpy"]
+
+
+def parse_importtime(stderr):
+    """Cumulative import time (us) of every top-level and nested module"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        module = name.strip()
+        # The first import of a module is the one that did the work
+        times.setdefault(module, int(cumulative))
+    return times
+
+
+def bench_import(module, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True)
+        wall = time.perf_counter() - start
+        times = parse_importtime(process.stderr)
+        result = {
+            "import_ms": times[module] / 1000,
+            "interpreter_ms": wall * 1000,
+        }
+        for dependency in HEAVY:
+            if dependency in times:
+                result[f"{dependency}_ms"] = times[dependency] / 1000
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", type=Path, help="Save results as JSON")
+    parser.add_argument("--compare",
+                        type=Path,
+                        help="Previous JSON results to compare against")
+    parser.add_argument("--only", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "benchmarks": {},
+    }
+    for module in args.only:
+        results["benchmarks"][module] = bench_import(module, args.repeat)
+        print(f"{module}: {json.dumps(results['benchmarks'][module])}")
+
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,15 @@
+from __future__ import annotations
+
 from pathlib import Path
 from dataclasses import dataclass
-from lerobot.motors import Motor, MotorNormMode
+from typing import TYPE_CHECKING
+
+# lerobot.motors pulls in torch and RobotPosition NumPy, both take long to
+# import. They are imported when a limb config is first used, see
+# __getattr__, so the names below are available right away.
+if TYPE_CHECKING:
+    from lerobot.motors import Motor
+    from RobotPosition import RobotPosition
 
 # Robot servo
 SHOULDER_PAN = "shoulder_pan.pos"
@@ -16,10 +25,6 @@ MID_WHEEL = "mid_wheel.pos"
 RETURN_KEY = 'm'
 
 
-class RobotPosition(dict[str, float]):
-    def __str__(self):
-        return str("\n" + "\t\n".join(f"{k}: {v:.1f}" for k, v in self.items()) + "\n")
-
 @dataclass(frozen=True)
 class EvaRobotConfig:
     id: str
@@ -31,94 +36,141 @@ class EvaRobotConfig:
     speed = 10
     error = 5
     control_interval = 1.0 / 50
+    # Cached present position older than this (seconds) is read again
+    max_position_age: float = 1.0 / 50
+    # Motion profile limits (deg/s, deg/s^2), a number or {servo: limit}.
+    # Moves larger than speed follow a profile, see MotionProfile
+    max_velocity: float | dict = 500.0
+    max_acceleration: float | dict = 2500.0
+    motion_profile: str = "trapezoid"
+    # Rows (motor, zero offset, scale) like the scripts' JOINT_CALIBRATION.
+    # Positions are read calibrated and commands written back raw
+    joint_calibration: tuple = None
+
+
+# Gamepad bindings onto the keys above, by evdev code name.
+# Axes map to (negative key, positive key), buttons to one key.
+GAMEPAD_AXES = {
+    "ABS_X": ('q', '1'),
+    "ABS_Y": ('2', 'w'),
+    "ABS_RX": ('z', 'a'),
+    "ABS_RY": ('s', 'x'),
+    "ABS_HAT0X": ('u', '7'),
+    "ABS_HAT0Y": ('8', 'i'),
+}
+GAMEPAD_BUTTONS = {
+    "BTN_TL": 'y',
+    "BTN_TR": '6',
+    "BTN_WEST": 'n',
+    "BTN_EAST": 'h',
+    "BTN_START": RETURN_KEY,
+}
+
+LIMB_CONFIGS = ("LEFT_ARM_CONFIG", "RIGHT_ARM_CONFIG", "FOOT_CONFIG")
+
+
+def _build_limb_configs():
+    from lerobot.motors import Motor, MotorNormMode
+    from RobotPosition import RobotPosition
+
+    global LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG
+    LEFT_ARM_CONFIG = EvaRobotConfig(
+        id="left_arm",
+        port="/dev/tty.usbmodem5AB01583061",
+        motors = {
+            "shoulder_pan": Motor(1, "sts3215", MotorNormMode.DEGREES),
+            "shoulder_lift": Motor(2, "sts3215", MotorNormMode.DEGREES),
+            "elbow_flex": Motor(3, "sts3215", MotorNormMode.DEGREES),
+            "wrist_flex": Motor(4, "sts3215", MotorNormMode.DEGREES),
+            "wrist_roll": Motor(5, "sts3215", MotorNormMode.DEGREES),
+            "gripper": Motor(6, "sts3215", MotorNormMode.RANGE_0_100),
+        },
+        robot_controls={
+            '1': (SHOULDER_PAN, 1),
+            'q': (SHOULDER_PAN, -1),
+            '2': (SHOULDER_LIFT, 1),
+            'w': (SHOULDER_LIFT, -1),
+            '3': (ELBOW_FLEX, 1),
+            'e': (ELBOW_FLEX, -1),
+            '4': (WRIST_FLEX, 1),
+            'r': (WRIST_FLEX, -1),
+            '5': (WRIST_ROLL, 1),
+            't': (WRIST_ROLL, -1),
+            '6': (GRIPPER, 1),
+            'y': (GRIPPER, -1),
+        },
+        default_position=RobotPosition({
+            SHOULDER_PAN: 67,
+            SHOULDER_LIFT: -32,
+            ELBOW_FLEX: 0,
+            WRIST_FLEX: 0,
+            WRIST_ROLL: 0,
+            GRIPPER: 0,
+        })
+    )
+
+    RIGHT_ARM_CONFIG = EvaRobotConfig(
+        id="right_arm",
+        port="/dev/tty.usbmodem5AB01584211",
+        motors = {
+            "shoulder_pan": Motor(1, "sts3215", MotorNormMode.DEGREES),
+            "shoulder_lift": Motor(2, "sts3215", MotorNormMode.DEGREES),
+            "elbow_flex": Motor(3, "sts3215", MotorNormMode.DEGREES),
+            "wrist_flex": Motor(4, "sts3215", MotorNormMode.DEGREES),
+            "wrist_roll": Motor(5, "sts3215", MotorNormMode.DEGREES),
+            "gripper": Motor(6, "sts3215", MotorNormMode.RANGE_0_100),
+        },
+        robot_controls={
+            'a': (SHOULDER_PAN, 1),
+            'z': (SHOULDER_PAN, -1),
+            's': (SHOULDER_LIFT, 1),
+            'x': (SHOULDER_LIFT, -1),
+            'd': (ELBOW_FLEX, 1),
+            'c': (ELBOW_FLEX, -1),
+            'f': (WRIST_FLEX, 1),
+            'v': (WRIST_FLEX, -1),
+            'g': (WRIST_ROLL, 1),
+            'b': (WRIST_ROLL, -1),
+            'h': (GRIPPER, 1),
+            'n': (GRIPPER, -1),
+        },
+        default_position=RobotPosition({
+            SHOULDER_PAN: 0,
+            SHOULDER_LIFT: -84,
+            ELBOW_FLEX: 0,
+            WRIST_FLEX: 11,
+            WRIST_ROLL: -5,
+            GRIPPER: 0,
+        })
+    )
 
+    FOOT_CONFIG = EvaRobotConfig(
+        id="base_foot",
+        port="/dev/tty.usbmodem5AB01584211",
+        motors={
+            "left_wheel": Motor(7, "sts3215", MotorNormMode.RANGE_M100_100),
+            "right_wheel": Motor(8, "sts3215", MotorNormMode.RANGE_M100_100),
+            "mid_wheel": Motor(9, "sts3215", MotorNormMode.RANGE_M100_100),
+        },
+        robot_controls={
+            '7': (LEFT_WHEEL, 1),
+            'u': (LEFT_WHEEL, -1),
+            '8': (RIGHT_WHEEL, 1),
+            'i': (RIGHT_WHEEL, -1), 
+            '9': (MID_WHEEL, 1),
+            'o': (MID_WHEEL, -1),
+        },
+        default_position=None
+    )
 
 
-LEFT_ARM_CONFIG = EvaRobotConfig(
-    id="left_arm",
-    port="/dev/tty.usbmodem5AB01583061",
-    motors = {
-        "shoulder_pan": Motor(1, "sts3215", MotorNormMode.DEGREES),
-        "shoulder_lift": Motor(2, "sts3215", MotorNormMode.DEGREES),
-        "elbow_flex": Motor(3, "sts3215", MotorNormMode.DEGREES),
-        "wrist_flex": Motor(4, "sts3215", MotorNormMode.DEGREES),
-        "wrist_roll": Motor(5, "sts3215", MotorNormMode.DEGREES),
-        "gripper": Motor(6, "sts3215", MotorNormMode.RANGE_0_100),
-    },
-    robot_controls={
-        '1': (SHOULDER_PAN, 1),
-        'q': (SHOULDER_PAN, -1),
-        '2': (SHOULDER_LIFT, 1),
-        'w': (SHOULDER_LIFT, -1),
-        '3': (ELBOW_FLEX, 1),
-        'e': (ELBOW_FLEX, -1),
-        '4': (WRIST_FLEX, 1),
-        'r': (WRIST_FLEX, -1),
-        '5': (WRIST_ROLL, 1),
-        't': (WRIST_ROLL, -1),
-        '6': (GRIPPER, 1),
-        'y': (GRIPPER, -1),
-    },
-    default_position=RobotPosition({
-        SHOULDER_PAN: 67,
-        SHOULDER_LIFT: -32,
-        ELBOW_FLEX: 0,
-        WRIST_FLEX: 0,
-        WRIST_ROLL: 0,
-        GRIPPER: 0,
-    })
-)
-
-RIGHT_ARM_CONFIG = EvaRobotConfig(
-    id="right_arm",
-    port="/dev/tty.usbmodem5AB01584211",
-    motors = {
-        "shoulder_pan": Motor(1, "sts3215", MotorNormMode.DEGREES),
-        "shoulder_lift": Motor(2, "sts3215", MotorNormMode.DEGREES),
-        "elbow_flex": Motor(3, "sts3215", MotorNormMode.DEGREES),
-        "wrist_flex": Motor(4, "sts3215", MotorNormMode.DEGREES),
-        "wrist_roll": Motor(5, "sts3215", MotorNormMode.DEGREES),
-        "gripper": Motor(6, "sts3215", MotorNormMode.RANGE_0_100),
-    },
-    robot_controls={
-        'a': (SHOULDER_PAN, 1),
-        'z': (SHOULDER_PAN, -1),
-        's': (SHOULDER_LIFT, 1),
-        'x': (SHOULDER_LIFT, -1),
-        'd': (ELBOW_FLEX, 1),
-        'c': (ELBOW_FLEX, -1),
-        'f': (WRIST_FLEX, 1),
-        'v': (WRIST_FLEX, -1),
-        'g': (WRIST_ROLL, 1),
-        'b': (WRIST_ROLL, -1),
-        'h': (GRIPPER, 1),
-        'n': (GRIPPER, -1),
-    },
-    default_position=RobotPosition({
-        SHOULDER_PAN: 0,
-        SHOULDER_LIFT: -84,
-        ELBOW_FLEX: 0,
-        WRIST_FLEX: 11,
-        WRIST_ROLL: -5,
-        GRIPPER: 0,
-    })
-)
-
-FOOT_CONFIG = EvaRobotConfig(
-    id="base_foot",
-    port="/dev/tty.usbmodem5AB01584211",
-    motors={
-        "left_wheel": Motor(7, "sts3215", MotorNormMode.RANGE_M100_100),
-        "right_wheel": Motor(8, "sts3215", MotorNormMode.RANGE_M100_100),
-        "mid_wheel": Motor(9, "sts3215", MotorNormMode.RANGE_M100_100),
-    },
-    robot_controls={
-        '7': (LEFT_WHEEL, 1),
-        'u': (LEFT_WHEEL, -1),
-        '8': (RIGHT_WHEEL, 1),
-        'i': (RIGHT_WHEEL, -1), 
-        '9': (MID_WHEEL, 1),
-        'o': (MID_WHEEL, -1),
-    },
-    default_position=None
-)
\ No newline at end of file
+# Build the limb configs on first access, e.g. from constants import
+# LEFT_ARM_CONFIG. RobotPosition is still exported for existing callers
+def __getattr__(name: str):
+    if name in LIMB_CONFIGS:
+        _build_limb_configs()
+        return globals()[name]
+    if name == "RobotPosition":
+        from RobotPosition import RobotPosition
+        return RobotPosition
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,157 @@
+"""
+2-link kinematics of the SO100 arm (shoulder_lift + elbow_flex)
+
+Link constants and joint offsets are computed once at import time.
+The *_array functions take NumPy arrays of targets and solve them in
+one call, e.g. both arms at once or a whole Cartesian trajectory.
+"""
+
+import math
+
+import numpy as np
+
+# Upper and lower arm lengths (m)
+L1 = 0.1159
+L2 = 0.1350
+
+# theta1 offset when joint2=0, theta2 offset when joint3=0
+THETA1_OFFSET = math.atan2(0.028, 0.11257)
+THETA2_OFFSET = math.atan2(0.0052, 0.1349) + THETA1_OFFSET
+
+# Joint limits from the URDF (radians)
+JOINT2_LIMITS = (-0.1, 3.45)
+JOINT3_LIMITS = (-0.2, math.pi)
+
+
+def inverse_kinematics(x, y, l1=L1, l2=L2):
+    """
+    Calculate inverse kinematics for a 2-link robotic arm, considering joint offsets
+
+    Parameters:
+        x: End effector x coordinate
+        y: End effector y coordinate
+        l1: Upper arm length (default 0.1159 m)
+        l2: Lower arm length (default 0.1350 m)
+
+    Returns:
+        joint2_deg, joint3_deg: shoulder_lift and elbow_flex targets in degrees
+    """
+    # Calculate distance from origin to target point
+    r = math.sqrt(x**2 + y**2)
+    r_max = l1 + l2  # Maximum reachable distance
+
+    # If target point is beyond maximum workspace, scale it to the boundary
+    if r > r_max:
+        scale_factor = r_max / r
+        x *= scale_factor
+        y *= scale_factor
+        r = r_max
+
+    # If target point is less than minimum workspace (|l1-l2|), scale it
+    r_min = abs(l1 - l2)
+    if r < r_min and r > 0:
+        scale_factor = r_min / r
+        x *= scale_factor
+        y *= scale_factor
+        r = r_min
+
+    # Use law of cosines to calculate theta2, clamp rounding errors at the
+    # workspace boundary
+    cos_theta2 = -(r**2 - l1**2 - l2**2) / (2 * l1 * l2)
+    cos_theta2 = max(-1.0, min(1.0, cos_theta2))
+
+    # Calculate theta2 (elbow angle)
+    theta2 = math.pi - math.acos(cos_theta2)
+
+    # Calculate theta1 (shoulder angle)
+    beta = math.atan2(y, x)
+    gamma = math.atan2(l2 * math.sin(theta2), l1 + l2 * math.cos(theta2))
+    theta1 = beta + gamma
+
+    # Convert theta1 and theta2 to joint2 and joint3 angles
+    joint2 = theta1 + THETA1_OFFSET
+    joint3 = theta2 + THETA2_OFFSET
+
+    # Ensure angles are within URDF limits
+    joint2 = max(JOINT2_LIMITS[0], min(JOINT2_LIMITS[1], joint2))
+    joint3 = max(JOINT3_LIMITS[0], min(JOINT3_LIMITS[1], joint3))
+
+    # Convert from radians to degrees
+    joint2_deg = 90 - math.degrees(joint2)
+    joint3_deg = math.degrees(joint3) - 90
+
+    return joint2_deg, joint3_deg
+
+
+def inverse_kinematics_array(x, y, l1=L1, l2=L2):
+    """
+    Vectorized inverse_kinematics for arrays of targets
+
+    Parameters:
+        x: Array of end effector x coordinates
+        y: Array of end effector y coordinates, same shape as x
+        l1: Upper arm length
+        l2: Lower arm length
+
+    Returns:
+        joint2_deg, joint3_deg: Arrays of joint targets in degrees
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    r = np.hypot(x, y)
+
+    # Scale targets outside the workspace to its boundary
+    r_max = l1 + l2
+    r_min = abs(l1 - l2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(r > r_max, r_max / r, 1.0)
+        scale = np.where((r < r_min) & (r > 0), r_min / r, scale)
+    x = x * scale
+    y = y * scale
+    r = r * scale
+
+    cos_theta2 = -(r**2 - l1**2 - l2**2) / (2 * l1 * l2)
+    theta2 = np.pi - np.arccos(np.clip(cos_theta2, -1.0, 1.0))
+
+    beta = np.arctan2(y, x)
+    gamma = np.arctan2(l2 * np.sin(theta2), l1 + l2 * np.cos(theta2))
+    theta1 = beta + gamma
+
+    joint2 = np.clip(theta1 + THETA1_OFFSET, *JOINT2_LIMITS)
+    joint3 = np.clip(theta2 + THETA2_OFFSET, *JOINT3_LIMITS)
+
+    return 90 - np.degrees(joint2), np.degrees(joint3) - 90
+
+
+def forward_kinematics(joint2_deg, joint3_deg, l1=L1, l2=L2):
+    """
+    Calculate the end effector position, inverse of inverse_kinematics
+
+    Parameters:
+        joint2_deg: shoulder_lift angle in degrees
+        joint3_deg: elbow_flex angle in degrees
+        l1: Upper arm length
+        l2: Lower arm length
+
+    Returns:
+        x, y: End effector coordinates
+    """
+    theta1 = math.radians(90 - joint2_deg) - THETA1_OFFSET
+    theta2 = math.radians(joint3_deg + 90) - THETA2_OFFSET
+    x = l1 * math.cos(theta1) + l2 * math.cos(theta1 - theta2)
+    y = l1 * math.sin(theta1) + l2 * math.sin(theta1 - theta2)
+    return x, y
+
+
+def forward_kinematics_array(joint2_deg, joint3_deg, l1=L1, l2=L2):
+    """
+    Vectorized forward_kinematics for arrays of joint angles
+
+    Returns:
+        x, y: Arrays of end effector coordinates
+    """
+    theta1 = np.radians(90 - np.asarray(joint2_deg)) - THETA1_OFFSET
+    theta2 = np.radians(np.asarray(joint3_deg) + 90) - THETA2_OFFSET
+    x = l1 * np.cos(theta1) + l2 * np.cos(theta1 - theta2)
+    y = l1 * np.sin(theta1) + l2 * np.sin(theta1 - theta2)
+    return x, y
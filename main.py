@@ -1,26 +1,117 @@
+import os
 import traceback
-from constants import LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG
-from Eva import Eva
 
-from utils import get_custom_logger
-
-from lerobot.robots.so100_follower import SO100Follower, SO100FollowerConfig
-from lerobot.teleoperators.keyboard import KeyboardTeleop, KeyboardTeleopConfig
+from utils import get_custom_logger, start_queued_logging, StageTimers
 
 logger = get_custom_logger()
 
+# Options of the Eva loop that the servo process does not support
+SERVO_PROCESS_UNSUPPORTED = ("EVA_TELEMETRY", "EVA_PROFILE", "EVA_JOG",
+                             "EVA_REPLAY", "EVA_ASYNC")
+
 
 def main():
     logger.info("Starting")
     logger.info("=" * 50)
 
+    # Imported here, so logging starts before NumPy and lerobot load
+    from constants import LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG
+    from Eva import Eva
+    from EvaInput import GamepadInput, NetworkInput
+    from Telemetry import TelemetryRecorder
+
+    # EVA_PROFILE=<path> times the control path and dumps the timers there
+    profile_path = os.environ.get("EVA_PROFILE")
+    stage_timers = StageTimers() if profile_path else None
+    # EVA_TELEMETRY=<path> records joint positions and commands there
+    telemetry_path = os.environ.get("EVA_TELEMETRY")
+    telemetry = None
+    # EVA_SERVO_PROCESS=1 runs the servo loop in its own process,
+    # pinned to core EVA_SERVO_CPU=<n> if set, see ServoProcess
+    servo_process = os.environ.get("EVA_SERVO_PROCESS") == "1"
+    # Terminal output runs on a listener thread, off the control loop
+    log_listener = start_queued_logging(logger)
     try:
-        eva = Eva(LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG)
-        eva.run()
+        if servo_process:
+            unsupported = [
+                name for name in SERVO_PROCESS_UNSUPPORTED
+                if os.environ.get(name, "0") not in ("", "0")
+            ]
+            if unsupported:
+                raise ValueError(f"EVA_SERVO_PROCESS=1 does not support "
+                                 f"{', '.join(unsupported)}")
+        if telemetry_path:
+            telemetry = TelemetryRecorder(telemetry_path)
+        # EVA_GAMEPAD=<device path|auto> and EVA_INPUT_PORT=<udp port> add
+        # input sources next to the keyboard
+        inputs = []
+        gamepad = os.environ.get("EVA_GAMEPAD")
+        if gamepad:
+            inputs.append(
+                GamepadInput(None if gamepad == "auto" else gamepad))
+        input_port = os.environ.get("EVA_INPUT_PORT")
+        if input_port:
+            inputs.append(NetworkInput(port=int(input_port)))
+        for source in inputs:
+            source.connect()
+        if servo_process:
+            run_servo_process(inputs)
+            return
+        eva = Eva(LEFT_ARM_CONFIG,
+                  RIGHT_ARM_CONFIG,
+                  FOOT_CONFIG,
+                  stage_timers=stage_timers,
+                  inputs=inputs,
+                  # EVA_JOG=1 moves held keys at a ramped velocity
+                  jog=os.environ.get("EVA_JOG") == "1",
+                  telemetry=telemetry,
+                  # EVA_TRUST_CALIBRATION=1 skips the handshake of ports
+                  # verified on an earlier run, other ports are checked once
+                  trust_calibration=os.environ.get(
+                      "EVA_TRUST_CALIBRATION") == "1")
+        # EVA_REPLAY=<path> replays a recording instead of the keyboard
+        # loop, EVA_REPLAY_SPEED=<n> plays it n times faster
+        replay_path = os.environ.get("EVA_REPLAY")
+        if replay_path:
+            eva.replay(replay_path,
+                       float(os.environ.get("EVA_REPLAY_SPEED", 1)))
+        elif os.environ.get("EVA_ASYNC") == "1":
+            # EVA_ASYNC=1 runs the bus I/O, input and control as asyncio
+            # tasks, see EvaRuntime
+            from EvaRuntime import EvaRuntime
+            EvaRuntime(eva).run()
+        else:
+            eva.run()
         eva.disconnect()
     except Exception as e:
         logger.error(f"Program execution failed: {e}")
         traceback.print_exc()
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+        log_listener.stop()
+        if stage_timers is not None:
+            stage_timers.dump(profile_path)
+
+
+def run_servo_process(inputs: list):
+    from constants import LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG
+    from Eva import Eva
+    from EvaInput import CombinedInput
+    from ServoProcess import ServoProcess
+
+    cpu = os.environ.get("EVA_SERVO_CPU")
+    servo = ServoProcess(LEFT_ARM_CONFIG,
+                         RIGHT_ARM_CONFIG,
+                         FOOT_CONFIG,
+                         cpu=None if cpu is None else int(cpu))
+    servo.start()
+    input = CombinedInput([Eva.init_keyboard(), *inputs])
+    try:
+        servo.run(input)
+    finally:
+        input.disconnect()
+        servo.stop()
 
 
 if __name__ == "__main__":
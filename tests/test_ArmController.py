@@ -0,0 +1,219 @@
+import dataclasses
+import time
+import numpy as np
+import pytest
+from ArmController import ArmController
+from constants import LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, SHOULDER_PAN
+from EvaInput import ScriptedInput
+from EvaRobot import EvaRobot
+from SimulatedMotorsBus import SimulatedMotorsBus, SimulatedFollower
+from trajectory import plan_cartesian_trajectory
+
+CALIBRATION = [
+    ['shoulder_pan', 6.0, 1.0],
+    ['shoulder_lift', 2.0, 0.97],
+    ['elbow_flex', 0.0, 1.05],
+    ['wrist_flex', 0.0, 0.94],
+    ['wrist_roll', 0.0, 0.5],
+    ['gripper', 0.0, 1.0],
+]
+
+
+class FakeFollower:
+
+    def __init__(self, observation: dict[str, float]):
+        self.observation = observation
+        self.actions = []
+
+    def get_observation(self) -> dict[str, float]:
+        return dict(self.observation, **{"front": "image"})
+
+    def send_action(self, action: dict[str, float]):
+        self.actions.append(action)
+
+
+def make_bus(config=LEFT_ARM_CONFIG, **kwargs) -> SimulatedMotorsBus:
+    kwargs = dict(max_velocity=5000, latency=0, byte_time=0) | kwargs
+    bus = SimulatedMotorsBus(config.port, config.motors, **kwargs)
+    bus.connect(handshake=False)
+    return bus
+
+
+def test_step_matches_calibrated_p_control():
+    raw = {
+        f"{name}.pos": 10.0 * i
+        for i, (name, _, _) in enumerate(CALIBRATION)
+    }
+    arms = {'arm1': FakeFollower(raw), 'arm2': FakeFollower(raw)}
+    controller = ArmController(arms, CALIBRATION)
+    controller.target[1] = 5.0
+    controller.step(kp=0.5)
+
+    for arm, target in zip(arms.values(), (0.0, 5.0)):
+        (action, ) = arm.actions
+        for name, offset, scale in CALIBRATION:
+            current = (raw[f"{name}.pos"] - offset) * scale
+            command = current + 0.5 * (target - current)
+            assert action[f"{name}.pos"] == pytest.approx(command / scale +
+                                                         offset)
+
+
+def test_keys_move_their_arm():
+    arms = {
+        'arm1': SimulatedFollower(make_bus()),
+        'arm2': SimulatedFollower(make_bus(RIGHT_ARM_CONFIG)),
+    }
+    controller = ArmController(
+        arms,
+        CALIBRATION,
+        joint_controls={
+            'arm1': {'a': ('shoulder_pan', 1)},
+            'arm2': {'b': ('gripper', -1)},
+        },
+        xy_controls={'arm2': {'u': ('x', 0.004)}},
+        pitch_controls={'arm2': {'=': 1}})
+    controller.reset_end_effector()
+    xy = controller.xy.copy()
+
+    controller.handle_action({'a': None, 'b': None, 'u': None, '=': None})
+    controller.handle_action({'a': None})
+    controller.step()
+
+    pan, lift, elbow, wrist, gripper = (controller.joints.index(name)
+                                        for name in ('shoulder_pan',
+                                                     'shoulder_lift',
+                                                     'elbow_flex',
+                                                     'wrist_flex', 'gripper'))
+    assert controller.target[0, pan] == 2
+    assert controller.target[1, gripper] == -1
+    assert controller.xy[1, 0] == pytest.approx(xy[1, 0] + 0.004)
+    assert controller.xy[0] == pytest.approx(xy[0])
+    # Only the end effector arm moves its lift and levels its wrist
+    assert controller.target[0, lift] == 0
+    assert controller.target[0, wrist] == 0
+    assert controller.target[1, wrist] == pytest.approx(
+        -controller.target[1, lift] - controller.target[1, elbow] + 1)
+
+
+def test_p_control_loop_returns_to_start():
+    start = {"shoulder_pan": 20.0, "elbow_flex": -10.0}
+    arms = {
+        'arm1': SimulatedFollower(make_bus(initial_positions=start)),
+        'arm2': SimulatedFollower(make_bus(initial_positions=start)),
+        'arm3': SimulatedFollower(make_bus(initial_positions=start)),
+    }
+    controller = ArmController(arms,
+                               CALIBRATION,
+                               joint_controls={
+                                   'arm3': {'a': ('shoulder_pan', 1)},
+                               },
+                               control_freq=200)
+    controller.read_start_positions()
+    controller.move_to_zero_position(duration=0.2)
+    pan = controller.joints.index('shoulder_pan')
+    assert np.abs(controller.read()[:, pan]).max() < 1
+
+    controller.p_control_loop(
+        ScriptedInput([{'a': None}] * 10, final={'x': None}))
+    for arm in arms.values():
+        assert arm.get_observation()[SHOULDER_PAN] == pytest.approx(20,
+                                                                    abs=1)
+
+
+def test_ports_are_read_and_written_in_parallel():
+    arms = {
+        'arm1': SimulatedFollower(make_bus(latency=0.02)),
+        'arm2': SimulatedFollower(make_bus(RIGHT_ARM_CONFIG, latency=0.02)),
+    }
+    controller = ArmController(arms, CALIBRATION)
+    assert controller.ports == [[0], [1]]
+    controller.step()
+    start = time.perf_counter()
+    controller.step()
+    # One read and one write per port, overlapped across the two ports
+    assert time.perf_counter() - start < 0.07
+    for arm in arms.values():
+        assert arm.bus.transactions == 4
+    controller.close()
+
+
+def test_drives_eva_robots():
+    robot = EvaRobot(LEFT_ARM_CONFIG, make_bus())
+    controller = ArmController(
+        {'left': robot},
+        joints=['shoulder_pan', 'elbow_flex'],
+        joint_controls={'left': {'a': ('shoulder_pan', 5)}})
+    controller.handle_action({'a': None})
+    for _ in range(3):
+        controller.step(kp=1.0)
+        time.sleep(0.01)
+    assert controller.read()[0] == pytest.approx([5, 0], abs=0.5)
+
+
+def test_eva_robots_are_calibrated_once():
+    start = {"shoulder_pan": 20.0}
+    config = dataclasses.replace(LEFT_ARM_CONFIG,
+                                 joint_calibration=(CALIBRATION[0], ))
+    robot = EvaRobot(config, make_bus(initial_positions=start))
+    follower = SimulatedFollower(
+        make_bus(RIGHT_ARM_CONFIG, initial_positions=start))
+    controller = ArmController({'left': robot, 'right': follower},
+                               CALIBRATION,
+                               joints=['shoulder_pan'])
+    # Both arms see (20 - 6) * 1.0, the EvaRobot through its own config
+    assert controller.read()[:, 0] == pytest.approx([14, 14])
+    controller.target[:] = 24
+    controller.step(kp=1.0)
+    time.sleep(0.01)
+    assert robot.get_current_position()[SHOULDER_PAN] == pytest.approx(
+        24, abs=0.5)
+    assert follower.get_observation()[SHOULDER_PAN] == pytest.approx(30,
+                                                                     abs=0.5)
+    controller.close()
+
+
+def test_rejects_conflicting_bindings():
+    arms = {'arm1': FakeFollower({}), 'arm2': FakeFollower({})}
+    with pytest.raises(ValueError, match="bound by both arm1 and arm2"):
+        ArmController(arms,
+                      CALIBRATION,
+                      joint_controls={
+                          'arm1': {'a': ('gripper', 1)},
+                          'arm2': {'a': ('gripper', -1)},
+                      })
+    with pytest.raises(ValueError, match="exit key"):
+        ArmController(arms,
+                      CALIBRATION,
+                      joint_controls={'arm1': {'x': ('gripper', 1)}})
+
+
+def test_follows_a_cartesian_trajectory():
+    raw = {f"{name}.pos": 0.0 for name, _, _ in CALIBRATION}
+    arms = {'arm1': FakeFollower(raw), 'arm2': FakeFollower(raw)}
+    controller = ArmController(arms,
+                               CALIBRATION,
+                               xy_controls={'arm1': {'u': ('x', 0.004)}},
+                               control_freq=200)
+    trajectory = plan_cartesian_trajectory([(0.16, 0.11), (0.2, 0.11)],
+                                           speed=0.4,
+                                           control_interval=1 / 200)
+    controller.follow('arm1', trajectory, kp=1.0)
+
+    lift, elbow, wrist = (controller.joints.index(name)
+                          for name in ('shoulder_lift', 'elbow_flex',
+                                       'wrist_flex'))
+    assert len(arms['arm1'].actions) == len(trajectory)
+    assert controller.target[0, [lift, elbow]] == pytest.approx(
+        [trajectory.joint2[-1], trajectory.joint3[-1]])
+    assert controller.target[0, wrist] == pytest.approx(
+        -trajectory.joint2[-1] - trajectory.joint3[-1])
+    assert controller.xy[0] == pytest.approx([0.2, 0.11])
+    # Other arms hold their targets
+    assert not controller.target[1].any()
+    # Every tick commands the next sample
+    for action, joint2 in zip(arms['arm1'].actions, trajectory.joint2):
+        _, offset, scale = CALIBRATION[lift]
+        assert action["shoulder_lift.pos"] == pytest.approx(joint2 / scale +
+                                                            offset)
+    with pytest.raises(ValueError, match="no end effector bindings"):
+        controller.follow('arm2', trajectory)
@@ -0,0 +1,190 @@
+import threading
+import time
+import pytest
+from constants import LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG
+from BusReader import BusReader
+from BusRegistry import BusRegistry
+from SimulatedMotorsBus import SimulatedMotorsBus
+import CalibrationCache
+
+
+class RecordingBus:
+
+    def __init__(self, motors):
+        self.motors = motors
+        self.reads = []
+        self.writes = []
+
+    def sync_read(self, data_name: str, motors: list[str] = None):
+        self.reads.append((data_name, motors))
+        names = self.motors if motors is None else motors
+        return {motor: i for i, motor in enumerate(names)}
+
+    def sync_write(self, data_name: str, values: dict):
+        self.writes.append((data_name, dict(values)))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return BusRegistry([LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG],
+                       cache_dir=tmp_path)
+
+
+def test_limbs_on_same_port_share_bus(registry):
+    right = registry.get_bus(RIGHT_ARM_CONFIG)
+    foot = registry.get_bus(FOOT_CONFIG)
+    left = registry.get_bus(LEFT_ARM_CONFIG)
+    assert right.shared is foot.shared
+    assert left.shared is not right.shared
+    assert set(right.shared.bus.motors) == set(RIGHT_ARM_CONFIG.motors) | set(
+        FOOT_CONFIG.motors)
+
+
+def test_tick_merges_reads_and_writes(registry):
+    right = registry.get_bus(RIGHT_ARM_CONFIG)
+    foot = registry.get_bus(FOOT_CONFIG)
+    fake = RecordingBus(list(right.shared.bus.motors))
+    right.shared.bus = fake
+
+    registry.begin_tick()
+    assert set(right.sync_read("Present_Position")) == set(
+        RIGHT_ARM_CONFIG.motors)
+    assert set(foot.sync_read("Present_Position")) == set(FOOT_CONFIG.motors)
+    right.sync_write("Goal_Position", {"gripper": 1})
+    foot.sync_write("Goal_Position", {"mid_wheel": 2})
+    assert fake.writes == []
+    registry.end_tick()
+
+    assert fake.reads == [("Present_Position", None)]
+    assert fake.writes == [("Goal_Position", {"gripper": 1, "mid_wheel": 2})]
+
+
+def test_unregistered_config_is_rejected(tmp_path):
+    registry = BusRegistry([LEFT_ARM_CONFIG], cache_dir=tmp_path)
+    with pytest.raises(ValueError):
+        registry.get_bus(FOOT_CONFIG)
+
+
+def test_reader_serves_reads_without_bus_io(registry):
+    right = registry.get_bus(RIGHT_ARM_CONFIG)
+    fake = RecordingBus(list(right.shared.bus.motors))
+    right.shared.bus = fake
+    right.shared.reader = BusReader(fake, right.shared.lock)
+    right.shared.reader.poll()
+    assert set(right.sync_read("Present_Position")) == set(
+        RIGHT_ARM_CONFIG.motors)
+    assert fake.reads == [("Present_Position", None)]
+
+
+def test_stale_reader_snapshot_is_read_again(registry):
+    right = registry.get_bus(RIGHT_ARM_CONFIG)
+    fake = RecordingBus(list(right.shared.bus.motors))
+    right.shared.bus = fake
+    right.shared.reader = BusReader(fake, right.shared.lock, rate=100)
+    right.shared.reader.poll()
+    # Polling stopped, e.g. the port fails
+    right.shared.reader.times[right.shared.reader.front] -= 1
+    right.sync_read("Present_Position")
+    assert fake.reads == [("Present_Position", None),
+                          ("Present_Position", list(RIGHT_ARM_CONFIG.motors))]
+
+
+def test_reader_thread_stops(registry):
+    right = registry.get_bus(RIGHT_ARM_CONFIG)
+    fake = RecordingBus(list(right.shared.bus.motors))
+    fake.port = right.shared.port
+    right.shared.bus = fake
+    right.shared.start_reader(rate=1000)
+    while right.shared.reader.latest("Present_Position") is None:
+        time.sleep(0.001)
+    right.shared.stop_reader()
+    reads = len(fake.reads)
+    time.sleep(0.01)
+    assert len(fake.reads) == reads
+
+
+def test_reader_double_buffer():
+    fake = RecordingBus(["a", "b"])
+    reader = BusReader(fake, threading.Lock(),
+                       ("Present_Position", "Present_Load"))
+    assert reader.latest("Present_Position") is None
+    reader.poll()
+    first = reader.latest("Present_Position")
+    reader.poll()
+    assert reader.latest("Present_Position") is not first
+    assert first == {"a": 0, "b": 1}
+    assert reader.latest("Present_Load") == {"a": 0, "b": 1}
+    assert fake.reads == [("Present_Position", None),
+                          ("Present_Load", None)] * 2
+
+
+def test_connect_opens_ports_in_parallel(tmp_path):
+    threads = set()
+
+    def bus_factory(port, motors, calibration):
+        bus = SimulatedMotorsBus(port, motors, calibration, latency=0.01)
+        connect = bus.connect
+
+        def slow_connect(handshake=True):
+            threads.add(threading.current_thread())
+            connect(handshake)
+
+        bus.connect = slow_connect
+        return bus
+
+    registry = BusRegistry([LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG],
+                           bus_factory, tmp_path)
+    registry.connect()
+    assert len(threads) == 2
+    buses = [shared.bus for shared in registry.buses.values()]
+    assert all(bus.is_connected for bus in buses)
+    # Only the handshake pings, the calibration is not read by default
+    assert all(bus.transactions == len(bus.motors) for bus in buses)
+    assert not any(
+        CalibrationCache.is_verified(config.calibration_dir, config.id,
+                                     config.port, tmp_path)
+        for config in (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG))
+
+    # Limbs share the opened ports
+    limb = registry.get_bus(LEFT_ARM_CONFIG)
+    limb.connect()
+    limb.disconnect()
+    assert not limb.is_connected
+
+
+def test_trusted_calibration_skips_handshake(tmp_path):
+    registry = BusRegistry([LEFT_ARM_CONFIG], SimulatedMotorsBus, tmp_path)
+    registry.connect(trust_calibration=True)
+    bus = registry.buses[LEFT_ARM_CONFIG.port].bus
+    # Handshake pings and calibration reads of the first check
+    assert bus.transactions == 4 * len(bus.motors)
+
+    registry = BusRegistry([LEFT_ARM_CONFIG], SimulatedMotorsBus, tmp_path)
+    registry.connect(trust_calibration=True)
+    assert registry.buses[LEFT_ARM_CONFIG.port].bus.transactions == 0
+
+
+def test_mismatched_calibration_is_not_verified(tmp_path):
+    registry = BusRegistry([LEFT_ARM_CONFIG], SimulatedMotorsBus, tmp_path)
+    shared = registry.get_bus(LEFT_ARM_CONFIG).shared
+    shared.bus.motor_calibration = {}
+    writes = shared.bus.writes
+    registry.connect(trust_calibration=True)
+    assert not shared.bus.is_calibrated
+    assert shared.bus.writes == writes
+    assert not CalibrationCache.is_verified(LEFT_ARM_CONFIG.calibration_dir,
+                                            LEFT_ARM_CONFIG.id,
+                                            LEFT_ARM_CONFIG.port, tmp_path)
+
+
+def test_simulated_buses_do_not_verify_ports(tmp_path, monkeypatch):
+    # The default cache, next to the calibration files
+    monkeypatch.setattr(CalibrationCache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(CalibrationCache, "_entries", {})
+    for _ in range(2):
+        registry = BusRegistry([LEFT_ARM_CONFIG], SimulatedMotorsBus)
+        registry.connect(trust_calibration=True)
+        assert registry.buses[LEFT_ARM_CONFIG.port].bus.transactions > 0
+    assert not CalibrationCache.is_verified(LEFT_ARM_CONFIG.calibration_dir,
+                                            LEFT_ARM_CONFIG.id,
+                                            LEFT_ARM_CONFIG.port)
@@ -0,0 +1,87 @@
+import json
+import os
+
+import draccus
+import pytest
+import CalibrationCache
+from CalibrationCache import is_verified, load_calibration, mark_verified
+
+CALIBRATION = {
+    "gripper": {
+        "id": 6,
+        "drive_mode": 0,
+        "homing_offset": 10,
+        "range_min": 100,
+        "range_max": 3000
+    }
+}
+
+
+@pytest.fixture
+def calibration_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(CalibrationCache, "_entries", {})
+    (tmp_path / "arm.json").write_text(json.dumps(CALIBRATION))
+    return tmp_path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    parses = []
+    load = draccus.load
+    monkeypatch.setattr(
+        draccus, "load", lambda *args: parses.append(args) or load(*args))
+    return parses
+
+
+def touch(path, seconds):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+def test_calibration_is_parsed_once(calibration_dir, parses):
+    calibration = load_calibration(calibration_dir, "arm")
+    assert calibration["gripper"].homing_offset == 10
+    assert load_calibration(calibration_dir, "arm") == calibration
+    # A new process loads the pickled calibration
+    CalibrationCache._entries.clear()
+    assert load_calibration(calibration_dir, "arm") == calibration
+    assert len(parses) == 1
+
+
+def test_modified_file_is_parsed_again(calibration_dir, parses):
+    load_calibration(calibration_dir, "arm")
+    CALIBRATION["gripper"]["homing_offset"] = 20
+    try:
+        (calibration_dir / "arm.json").write_text(json.dumps(CALIBRATION))
+    finally:
+        CALIBRATION["gripper"]["homing_offset"] = 10
+    touch(calibration_dir / "arm.json", 1)
+    assert load_calibration(calibration_dir,
+                            "arm")["gripper"].homing_offset == 20
+    assert len(parses) == 2
+
+
+def test_verification_lasts_until_file_changes(calibration_dir):
+    assert not is_verified(calibration_dir, "arm", "/dev/tty0")
+    mark_verified(calibration_dir, "arm", "/dev/tty0")
+    CalibrationCache._entries.clear()
+    assert is_verified(calibration_dir, "arm", "/dev/tty0")
+    assert not is_verified(calibration_dir, "arm", "/dev/tty1")
+    touch(calibration_dir / "arm.json", 1)
+    assert not is_verified(calibration_dir, "arm", "/dev/tty0")
+
+
+def test_corrupt_cache_is_ignored(calibration_dir, parses):
+    load_calibration(calibration_dir, "arm")
+    CalibrationCache._entries.clear()
+    (calibration_dir / ".cache" / "arm.pickle").write_bytes(b"garbage")
+    assert load_calibration(calibration_dir, "arm")["gripper"].id == 6
+    assert len(parses) == 2
+
+
+def test_cache_dir_keeps_its_own_verification(calibration_dir, tmp_path):
+    cache_dir = tmp_path / "other"
+    mark_verified(calibration_dir, "arm", "/dev/tty0", cache_dir)
+    assert (cache_dir / "arm.pickle").exists()
+    assert is_verified(calibration_dir, "arm", "/dev/tty0", cache_dir)
+    assert not is_verified(calibration_dir, "arm", "/dev/tty0")
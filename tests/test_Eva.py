@@ -0,0 +1,36 @@
+import dataclasses
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       RETURN_KEY, SHOULDER_PAN)
+from Eva import build_key_index
+from EvaRobot import EvaRobot
+
+
+def test_build_key_index():
+    robots = [
+        EvaRobot(LEFT_ARM_CONFIG, bus=object()),
+        EvaRobot(RIGHT_ARM_CONFIG, bus=object()),
+        EvaRobot(FOOT_CONFIG, bus=object()),
+    ]
+    key_index = build_key_index(robots)
+    assert key_index['q'] == (robots[0], SHOULDER_PAN, -1)
+    assert key_index['a'] == (robots[1], SHOULDER_PAN, 1)
+    assert len(key_index) == sum(
+        len(robot.config.robot_controls) for robot in robots)
+
+
+def test_build_key_index_rejects_conflicts():
+    other = dataclasses.replace(RIGHT_ARM_CONFIG,
+                                robot_controls={'q': (SHOULDER_PAN, 1)})
+    with pytest.raises(ValueError):
+        build_key_index([
+            EvaRobot(LEFT_ARM_CONFIG, bus=object()),
+            EvaRobot(other, bus=object()),
+        ])
+
+
+def test_build_key_index_rejects_return_key():
+    other = dataclasses.replace(RIGHT_ARM_CONFIG,
+                                robot_controls={RETURN_KEY: (SHOULDER_PAN, 1)})
+    with pytest.raises(ValueError):
+        build_key_index([EvaRobot(other, bus=object())])
@@ -0,0 +1,103 @@
+import json
+import socket
+import time
+
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       RETURN_KEY, SHOULDER_PAN)
+from Eva import Eva
+from EvaInput import (EV_ABS, EV_KEY, CombinedInput, GamepadInput,
+                      NetworkInput, ScriptedInput)
+from SimulatedMotorsBus import SimulatedMotorsBus
+
+ECODES = {"ABS_X": 0, "BTN_TR": 311, "BTN_START": 315}
+
+
+@pytest.fixture
+def gamepad() -> GamepadInput:
+    gamepad = GamepadInput(axes={"ABS_X": ('q', '1')},
+                           buttons={
+                               "BTN_TR": '6',
+                               "BTN_START": RETURN_KEY
+                           },
+                           deadzone=0.2)
+    gamepad.resolve(ECODES)
+    gamepad.axis_ranges[0] = (-100, 100)
+    return gamepad
+
+
+@pytest.fixture
+def network() -> NetworkInput:
+    network = NetworkInput(port=0, timeout=0.1)
+    network.connect()
+    yield network
+    network.disconnect()
+
+
+def send(network: NetworkInput, action):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        sender.sendto(json.dumps(action).encode(), network.address)
+    time.sleep(0.01)
+
+
+def test_combined_input_adds_sources():
+    combined = CombinedInput(
+        [ScriptedInput([{'1': 2}]),
+         ScriptedInput([{
+             '1': 0.5,
+             'q': 1
+         }])])
+    assert combined.get_action() == {'1': 2.5, 'q': 1}
+
+
+def test_gamepad_keeps_latest_axis_value(gamepad):
+    for value in (10, 60, 100):
+        gamepad.handle_event(EV_ABS, 0, value)
+    assert gamepad.get_action() == {'1': pytest.approx(1.0)}
+    gamepad.handle_event(EV_ABS, 0, -60)
+    assert gamepad.get_action() == {'q': pytest.approx(0.5)}
+    gamepad.handle_event(EV_ABS, 0, 10)
+    assert gamepad.get_action() == {}
+
+
+def test_gamepad_counts_button_presses(gamepad):
+    for value in (1, 0, 1):
+        gamepad.handle_event(EV_KEY, 311, value)
+    assert gamepad.get_action() == {'6': 2}
+    # Still held
+    assert gamepad.get_action() == {'6': 1}
+    gamepad.handle_event(EV_KEY, 311, 0)
+    gamepad.handle_event(EV_KEY, 315, 1)
+    assert gamepad.get_action() == {RETURN_KEY: 1}
+
+
+def test_network_latest_datagram_wins(network):
+    send(network, {'1': 1})
+    send(network, {'q': 0.5})
+    assert network.get_action() == {'q': 0.5}
+    # Held until the sender goes quiet
+    assert network.get_action() == {'q': 0.5}
+    time.sleep(0.15)
+    assert network.get_action() == {}
+
+
+def test_network_ignores_malformed_datagrams(network):
+    send(network, {'1': 1})
+    assert network.get_action() == {'1': 1}
+    send(network, ["not", "an", "action"])
+    assert network.get_action() == {'1': 1}
+
+
+def test_eva_reads_extra_inputs(network, tmp_path):
+    send(network, {'1': 2})
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=ScriptedInput([{}]),
+              inputs=[network])
+    eva.run()
+    assert eva.left_arm.target[SHOULDER_PAN] == 2 * LEFT_ARM_CONFIG.speed
+    eva.disconnect()
+    assert not network.is_connected
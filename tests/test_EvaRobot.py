@@ -1,5 +1,7 @@
 import pytest
-from constants import EvaRobotConfig, RobotPosition, SHOULDER_PAN
+import dataclasses
+from constants import (EvaRobotConfig, RobotPosition, SHOULDER_PAN,
+                       LEFT_ARM_CONFIG)
 from EvaRobot import EvaRobot
 from lerobot.motors.feetech import FeetechMotorsBus
 
@@ -7,7 +9,11 @@ from lerobot.motors.feetech import FeetechMotorsBus
 class FakeFeetechMotorsBus(FeetechMotorsBus):
 
     def __init__(self):
-        pass
+        self.writes = []
+
+    @property
+    def is_connected(self) -> bool:
+        return True
 
     def sync_read(self, data_name: str):
         return {
@@ -19,6 +25,9 @@ class FakeFeetechMotorsBus(FeetechMotorsBus):
             "gripper": 6,
         }
 
+    def sync_write(self, data_name: str, values: dict):
+        self.writes.append(dict(values))
+
 
 @pytest.fixture
 def fake_config():
@@ -77,3 +86,123 @@ def test_reach_position(fake_config):
             "wrist_roll.pos": 3,
             "gripper.pos": 2,
         })) == True
+
+
+def test_step_moves_short_distance_in_one_step(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(fake_config, bus)
+    robot.set_target(RobotPosition({"shoulder_pan.pos": 9}))
+    assert robot.profile is None
+    assert robot.step() == False
+    assert bus.writes[-1]["shoulder_pan"] == 9
+    assert robot.step() == True
+    assert robot.target is None
+    assert len(bus.writes) == 1
+
+
+def test_step_follows_motion_profile(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(fake_config, bus)
+    robot.set_target(RobotPosition({"shoulder_pan.pos": 31}))
+    steps = len(robot.profile)
+    while not robot.step():
+        pass
+    pan = [write["shoulder_pan"] for write in bus.writes]
+    assert len(pan) == steps
+    assert pan == sorted(pan)
+    assert pan[-1] == 31
+    assert all(write["gripper"] == 6 for write in bus.writes)
+    assert robot.target is None
+
+
+def test_step_without_target_is_idle(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(fake_config, bus)
+    assert robot.step() == True
+    assert bus.writes == []
+
+
+def test_cached_position_reads_bus_once(fake_config):
+    bus = FakeFeetechMotorsBus()
+    reads = []
+    sync_read = bus.sync_read
+    bus.sync_read = lambda data_name: reads.append(data_name) or sync_read(
+        data_name)
+    robot = EvaRobot(dataclasses.replace(fake_config, max_position_age=60),
+                     bus)
+    for _ in range(5):
+        robot.get_next_position("q")
+    robot.set_target(robot.get_next_position("q"))
+    assert reads == ["Present_Position"]
+
+
+def test_stale_cached_position_is_read_again(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(dataclasses.replace(fake_config, max_position_age=0),
+                     bus)
+    robot.get_cached_position()
+    robot.position[SHOULDER_PAN] = 100
+    assert robot.get_cached_position()[SHOULDER_PAN] == 1
+
+
+def test_get_position_after_deltas(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(fake_config, bus)
+    position = robot.get_position_after_deltas({
+        "shoulder_pan.pos": 2,
+        "gripper.pos": -1
+    })
+    assert position["shoulder_pan.pos"] == 21
+    assert position["gripper.pos"] == -4
+    assert position["elbow_flex.pos"] == 3
+
+
+def test_jog_ramps_velocity_up_and_down(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(
+        dataclasses.replace(fake_config,
+                            motors=LEFT_ARM_CONFIG.motors,
+                            max_velocity=100,
+                            max_acceleration=1000), bus)
+    robot.set_jog_velocity({SHOULDER_PAN: 500})
+    for _ in range(10):
+        assert robot.jog_step(0.02) == True
+    pan = [write["shoulder_pan"] for write in bus.writes]
+    steps = [b - a for a, b in zip([1] + pan, pan)]
+    # 20 deg/s more per tick up to max_velocity, 2 deg per tick
+    assert steps[:5] == pytest.approx([0.4, 0.8, 1.2, 1.6, 2.0])
+    assert steps[5:] == pytest.approx([2.0] * 5)
+    assert all(write["gripper"] == 6 for write in bus.writes)
+
+    robot.set_jog_velocity({})
+    while robot.jog_step(0.02):
+        pass
+    pan = [write["shoulder_pan"] for write in bus.writes]
+    steps = [b - a for a, b in zip(pan, pan[1:])]
+    assert steps[9:] == pytest.approx([1.6, 1.2, 0.8, 0.4, 0.0])
+    assert robot.jog_command is None
+
+
+def test_jog_without_velocity_is_idle(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(
+        dataclasses.replace(fake_config, motors=LEFT_ARM_CONFIG.motors), bus)
+    assert robot.jog_step(0.02) == False
+    robot.set_jog_velocity({})
+    assert robot.jog_step(0.02) == False
+    assert bus.writes == []
+
+
+def test_joint_calibration_on_read_and_write(fake_config):
+    bus = FakeFeetechMotorsBus()
+    robot = EvaRobot(
+        dataclasses.replace(fake_config,
+                            motors=LEFT_ARM_CONFIG.motors,
+                            joint_calibration=(("shoulder_pan", 1.0, 2.0),
+                                               ("gripper", 0.0, 0.5))), bus)
+    position = robot.get_current_position()
+    assert position[SHOULDER_PAN] == 0
+    assert position["gripper.pos"] == 3
+    assert position["elbow_flex.pos"] == 3
+    robot.move_to_position(RobotPosition({SHOULDER_PAN: 10, "gripper.pos": 3}))
+    assert bus.writes[-1] == {"shoulder_pan": 6, "gripper": 6}
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       SHOULDER_PAN)
+from Eva import Eva
+from EvaInput import ScriptedInput
+from EvaRuntime import EvaRuntime
+from SimulatedMotorsBus import SimulatedMotorsBus
+from utils import RateKeeper
+
+
+def make_eva(actions: list[dict], cache_dir) -> Eva:
+    return Eva(LEFT_ARM_CONFIG,
+               RIGHT_ARM_CONFIG,
+               FOOT_CONFIG,
+               bus_factory=SimulatedMotorsBus,
+               calibration_cache_dir=cache_dir,
+               keyboard=ScriptedInput(actions))
+
+
+def test_runtime_moves_limbs_on_bus_threads(tmp_path):
+    eva = make_eva([{'1': 1, 'a': 1}] * 5 + [{}] * 10, tmp_path)
+    runtime = EvaRuntime(eva)
+    runtime.run()
+
+    assert eva.rate_keeper.ticks >= 10
+    assert eva.left_arm.get_current_position()[SHOULDER_PAN] > 0
+    assert eva.right_arm.get_current_position()[SHOULDER_PAN] > 0
+    # Readers are detached again, so reads go to the bus
+    for shared in eva.bus_registry.buses.values():
+        assert shared.reader is None
+    for bus_task in runtime.bus_tasks:
+        assert bus_task.errors == 0
+    eva.disconnect()
+
+
+def test_services_share_the_latest_state(tmp_path):
+    eva = make_eva([{'1': 1}] * 3 + [{}] * 5, tmp_path)
+    states = []
+
+    async def record(runtime):
+        while True:
+            states.append(await runtime.next_state())
+
+    async def broken(runtime):
+        raise RuntimeError("broken service")
+
+    EvaRuntime(eva, services=[record, broken]).run()
+
+    assert len(states) >= 5
+    assert [state.tick for state in states] == sorted(
+        state.tick for state in states)
+    # The input is sampled once per tick, a held key every tick
+    assert [state.action for state in states[:4]] == [{'1': 1}] * 3 + [{}]
+    assert set(states[-1].positions) == {
+        LEFT_ARM_CONFIG.id, RIGHT_ARM_CONFIG.id, FOOT_CONFIG.id
+    }
+    # Limbs without keys pressed have positions too
+    for state in states:
+        assert None not in state.positions.values()
+    assert states[-1].positions[LEFT_ARM_CONFIG.id][SHOULDER_PAN] > 0
+    eva.disconnect()
+
+
+def test_rate_keeper_waits_without_blocking_the_loop():
+    rate_keeper = RateKeeper(0.02)
+    ticks = []
+
+    async def other():
+        for _ in range(5):
+            ticks.append("other")
+            await asyncio.sleep(0.001)
+
+    async def main():
+        task = asyncio.create_task(other())
+        assert await rate_keeper.wait_async()
+        await task
+
+    asyncio.run(main())
+    assert ticks == ["other"] * 5
+    assert rate_keeper.ticks == 1
+    assert rate_keeper.periods[0] == pytest.approx(0.02, abs=0.01)
+
+
+def test_publish_does_no_bus_io(tmp_path):
+    eva = make_eva([], tmp_path)
+    runtime = EvaRuntime(eva)
+    buses = eva.bus_registry.buses.values()
+    readers = [shared.attach_reader() for shared in buses]
+    for reader in readers:
+        reader.poll()
+        reader.bus.reset_counters()
+
+    async def publish():
+        runtime.tick = asyncio.Condition()
+        await runtime._publish({})
+        fresh = runtime.state
+        # Polling stalls, the stale snapshots are not read again
+        for reader in readers:
+            reader.times[reader.front] -= 1
+        await runtime._publish({})
+        return fresh, runtime.state
+
+    fresh, stale = asyncio.run(publish())
+    assert all(reader.bus.transactions == 0 for reader in readers)
+    assert set(fresh.positions) == {
+        LEFT_ARM_CONFIG.id, RIGHT_ARM_CONFIG.id, FOOT_CONFIG.id
+    }
+    # Stale limbs keep their last position
+    assert stale.positions == fresh.positions
+    eva.bus_registry.stop_readers()
+    eva.disconnect()
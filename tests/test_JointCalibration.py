@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from JointCalibration import JointCalibration
+
+TABLE = [
+    ['shoulder_pan', 6.0, 1.0],
+    ['shoulder_lift', 2.0, 0.97],
+    ['wrist_roll', 0.0, 0.5],
+]
+
+
+def test_apply_and_invert_round_trip():
+    calibration = JointCalibration(TABLE)
+    raw = np.array([10.0, 4.0, 8.0])
+    calibrated = calibration.apply(raw)
+    assert calibrated == pytest.approx([4.0, 1.94, 4.0])
+    assert calibration.invert(calibrated) == pytest.approx(raw)
+
+
+def test_joints_without_row_pass_through():
+    calibration = JointCalibration(TABLE, ("gripper", "shoulder_pan"))
+    assert calibration.apply(np.array([3.0, 10.0])) == pytest.approx([3, 4])
+
+
+def test_take_reorders_joints():
+    calibration = JointCalibration(TABLE)
+    taken = calibration.take(("wrist_roll", "shoulder_pan"))
+    assert taken.apply(np.array([8.0, 10.0])) == pytest.approx([4.0, 4.0])
+    assert calibration.take(("wrist_roll", "shoulder_pan")) is taken
+
+
+def test_read_observation_and_build_action():
+    calibration = JointCalibration(TABLE)
+    observation = {
+        "shoulder_pan.pos": 10.0,
+        "shoulder_lift.pos": 4.0,
+        "wrist_roll.pos": 8.0,
+        "camera": None,
+    }
+    positions = calibration.read(observation)
+    assert positions == pytest.approx({
+        "shoulder_pan": 4.0,
+        "shoulder_lift": 1.94,
+        "wrist_roll": 4.0
+    })
+    assert calibration.action({"wrist_roll": 1.0}) == {"wrist_roll.pos": 2.0}
+    assert calibration.action(positions) == pytest.approx({
+        "shoulder_pan.pos": 10.0,
+        "shoulder_lift.pos": 4.0,
+        "wrist_roll.pos": 8.0
+    })
@@ -0,0 +1,43 @@
+import logging
+from constants import RobotPosition, SHOULDER_PAN
+from utils import LogFormatter, start_queued_logging
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_formatters_are_cached_per_level():
+    formatter = LogFormatter()
+    record = logging.LogRecord("Eva", logging.WARNING, __file__, 1, "%s",
+                               ("hello", ), None)
+    assert "hello" in formatter.format(record)
+    assert formatter.formatters[logging.WARNING] is formatter.formatters[
+        logging.WARNING]
+    record.levelno = 5
+    assert formatter.format(record) == "hello"
+
+
+def test_queued_logging_formats_on_listener():
+    logger = logging.getLogger("test_queued_logging")
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+
+    listener = start_queued_logging(logger)
+    assert handler not in logger.handlers
+    position = RobotPosition({SHOULDER_PAN: 1})
+    logger.warning("at %s", position)
+    # The argument is copied, later changes do not show up in the log
+    position[SHOULDER_PAN] = 2
+    listener.stop()
+
+    assert handler.messages == [f"at {RobotPosition({SHOULDER_PAN: 1})}"]
+    assert logger.handlers == [handler]
+    logger.removeHandler(handler)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from MotionProfile import MotionProfile, TRAPEZOID, S_CURVE
+
+DT = 0.02
+
+
+@pytest.mark.parametrize("shape", [TRAPEZOID, S_CURVE])
+def test_profile_respects_limits_and_synchronizes(shape):
+    start = np.array([0.0, 10.0, 5.0])
+    goal = np.array([100.0, -10.0, 5.0])
+    profile = MotionProfile(start, goal, [500, 100, 500], [2500, 2500, 2500],
+                            DT, shape)
+    np.testing.assert_array_equal(profile[len(profile) - 1], goal)
+    velocity = np.diff(np.vstack([start, profile.samples]), axis=0) / DT
+    assert np.all(np.abs(velocity) <= np.array([500, 100, 500]) + 1e-6)
+    # Every joint covers the same fraction of its move at every tick
+    fraction = (profile.samples - start)[:, :2] / (goal - start)[:2]
+    np.testing.assert_allclose(fraction[:, 0], fraction[:, 1])
+
+
+def test_long_move_cruises_at_max_velocity():
+    profile = MotionProfile([0.0], [1000.0], 500, 2500, DT)
+    assert profile.duration == pytest.approx(1000 / 500 + 500 / 2500)
+
+
+def test_zero_move():
+    profile = MotionProfile([1.0, 2.0], [1.0, 2.0], 500, 2500, DT)
+    assert len(profile) == 1
+    assert profile.duration == 0.0
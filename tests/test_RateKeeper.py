@@ -0,0 +1,58 @@
+import importlib
+import time
+import pytest
+from utils import RateKeeper
+
+
+# perf_counter and sleep of a clock that only moves when asked to, every
+# perf_counter call takes step seconds like a busy wait does
+class FakeClock:
+
+    def __init__(self, step: float = 0.0001):
+        self.now = 0.0
+        self.step = step
+
+    def perf_counter(self) -> float:
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += max(seconds, 0.0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(importlib.import_module("utils.RateKeeper"), "time",
+                        clock)
+    return clock
+
+
+def test_keeps_rate_despite_work(clock):
+    rate_keeper = RateKeeper(0.01, busy_wait=0.001)
+    for _ in range(20):
+        clock.sleep(0.004)
+        assert rate_keeper.wait()
+    assert rate_keeper.ticks == 20
+    assert rate_keeper.overruns == 0
+    assert rate_keeper.achieved_hz == pytest.approx(100, abs=0.5)
+
+
+def test_missed_deadline_restarts_the_schedule(clock):
+    rate_keeper = RateKeeper(0.01)
+    clock.sleep(0.025)
+    assert not rate_keeper.wait()
+    # The next deadline is one period after the overrun, not a catch up
+    start = clock.now
+    assert rate_keeper.wait()
+    assert clock.now - start == pytest.approx(0.01, abs=0.001)
+    assert rate_keeper.overruns == 1
+
+
+def test_counts_overruns():
+    rate_keeper = RateKeeper(0.001)
+    time.sleep(0.005)
+    assert not rate_keeper.wait()
+    assert rate_keeper.overruns == 1
+    percentiles = rate_keeper.jitter_percentiles((50, 99))
+    assert percentiles[99] >= 0.003
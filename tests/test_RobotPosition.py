@@ -0,0 +1,29 @@
+import numpy as np
+from constants import RobotPosition, SHOULDER_PAN, GRIPPER, ELBOW_FLEX
+
+
+def test_dict_compatible():
+    position = RobotPosition({SHOULDER_PAN: 1, GRIPPER: 2})
+    position[SHOULDER_PAN] += 10
+    assert position == {SHOULDER_PAN: 11, GRIPPER: 2}
+    assert list(position.items()) == [(SHOULDER_PAN, 11.0), (GRIPPER, 2.0)]
+    position[ELBOW_FLEX] = 3
+    assert list(position) == [SHOULDER_PAN, GRIPPER, ELBOW_FLEX]
+    assert RobotPosition(position) == position
+    assert RobotPosition(position) is not position
+
+
+def test_from_motors_shares_schema():
+    a = RobotPosition.from_motors({"shoulder_pan": 1, "gripper": 2})
+    b = RobotPosition.from_motors({"shoulder_pan": 3, "gripper": 4})
+    assert a.schema is b.schema
+    assert a == {SHOULDER_PAN: 1, GRIPPER: 2}
+    assert b.motor_dict() == {"shoulder_pan": 3, "gripper": 4}
+
+
+def test_move_towards_subset_target():
+    current = RobotPosition({SHOULDER_PAN: 0, GRIPPER: 0, ELBOW_FLEX: 0})
+    target = RobotPosition({GRIPPER: -25, SHOULDER_PAN: 4})
+    np.testing.assert_array_equal(current.error(target), [-25, 4])
+    current.move_towards(target, 10)
+    assert current == {SHOULDER_PAN: 4, GRIPPER: -10, ELBOW_FLEX: 0}
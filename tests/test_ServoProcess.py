@@ -0,0 +1,81 @@
+import threading
+import time
+import numpy as np
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       SHOULDER_PAN)
+from EvaInput import ScriptedInput
+from ServoProcess import SeqLockArray, ServoProcess
+from SimulatedMotorsBus import SimulatedMotorsBus
+
+
+def test_seqlock_array_round_trip():
+    array = SeqLockArray((2, 3))
+    out = np.zeros((2, 3))
+    assert array.read(out) == 0
+    assert np.isnan(out).all()
+
+    other = SeqLockArray((2, 3), array.name)
+    other.write(np.arange(6).reshape(2, 3))
+    assert array.read(out) == 1
+    np.testing.assert_array_equal(out, np.arange(6).reshape(2, 3))
+    other.close()
+    array.close()
+
+
+def test_seqlock_read_waits_for_the_writer():
+    array = SeqLockArray((3, ))
+    array.write(np.zeros(3))
+    # A write in progress: odd sequence number, half written values
+    array.seq[0] += 1
+    array.values[0] = 1
+    out = np.zeros(3)
+    reader = threading.Thread(target=array.read, args=(out, ))
+    reader.start()
+    time.sleep(0.01)
+    assert reader.is_alive()
+    array.values[1:] = 1
+    array.seq[0] += 1
+    reader.join(1)
+    assert not reader.is_alive()
+    np.testing.assert_array_equal(out, np.ones(3))
+    array.close()
+
+
+def test_servo_process_follows_the_keys(tmp_path):
+    servo = ServoProcess(LEFT_ARM_CONFIG,
+                         RIGHT_ARM_CONFIG,
+                         FOOT_CONFIG,
+                         bus_factory=SimulatedMotorsBus,
+                         calibration_cache_dir=tmp_path)
+    servo.start()
+    try:
+        before = servo.get_positions()
+        assert set(before) == {
+            LEFT_ARM_CONFIG.id, RIGHT_ARM_CONFIG.id, FOOT_CONFIG.id
+        }
+        servo.run(ScriptedInput([{'1': 20}] + [{}] * 40))
+        after = servo.get_positions()
+        delta = 20 * LEFT_ARM_CONFIG.robot_controls['1'][1] * \
+            LEFT_ARM_CONFIG.speed
+        assert after[LEFT_ARM_CONFIG.id][SHOULDER_PAN] == pytest.approx(
+            before[LEFT_ARM_CONFIG.id][SHOULDER_PAN] + delta, abs=1)
+        # Limbs without keys hold their position
+        assert after[RIGHT_ARM_CONFIG.id].values == pytest.approx(
+            before[RIGHT_ARM_CONFIG.id].values, abs=1)
+    finally:
+        servo.stop()
+    assert servo.process.exitcode == 0
+
+
+def test_zero_magnitude_sends_no_target(tmp_path):
+    servo = ServoProcess(LEFT_ARM_CONFIG,
+                         RIGHT_ARM_CONFIG,
+                         FOOT_CONFIG,
+                         bus_factory=SimulatedMotorsBus,
+                         calibration_cache_dir=tmp_path)
+    servo.apply_action({'1': 0})
+    assert servo.targets.version == 0
+    servo.apply_action({'1': None})
+    assert servo.targets.version == 1
+    servo.stop()
@@ -0,0 +1,116 @@
+import time
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       SHOULDER_PAN, RobotPosition)
+from Eva import Eva
+from EvaInput import ScriptedInput
+from EvaRobot import EvaRobot
+from SimulatedMotorsBus import SimulatedMotorsBus, SimulatedFollower
+from utils import StageTimers
+
+
+def make_bus(**kwargs) -> SimulatedMotorsBus:
+    bus = SimulatedMotorsBus(LEFT_ARM_CONFIG.port, LEFT_ARM_CONFIG.motors,
+                             **kwargs)
+    bus.connect(handshake=False)
+    return bus
+
+
+def test_servo_moves_at_max_velocity():
+    bus = make_bus(max_velocity=1000, latency=0, byte_time=0)
+    bus.sync_write("Goal_Position", {"gripper": 50})
+    time.sleep(0.02)
+    assert 0 < bus.sync_read("Present_Position")["gripper"] < 50
+    time.sleep(0.05)
+    assert bus.read("Present_Position", "gripper") == 50
+    assert bus.transactions == 3
+
+
+def test_transactions_cost_serial_time():
+    bus = make_bus(latency=0.002, byte_time=0)
+    start = time.perf_counter()
+    bus.sync_read("Present_Position")
+    assert time.perf_counter() - start >= 0.002
+    assert bus.bytes == 8 + 6 + 6 * 8
+
+
+def test_robot_move_converges():
+    bus = make_bus(max_velocity=2000)
+    robot = EvaRobot(LEFT_ARM_CONFIG, bus)
+    robot.move_to_position_in_loop(RobotPosition({SHOULDER_PAN: 60}))
+    time.sleep(0.05)
+    assert robot.get_current_position()[SHOULDER_PAN] == pytest.approx(60)
+
+
+def test_follower_interface():
+    follower = SimulatedFollower(make_bus(latency=0, byte_time=0))
+    assert follower.send_action({SHOULDER_PAN: 1.0}) == {SHOULDER_PAN: 1.0}
+    assert set(follower.get_observation()) == {
+        f"{motor}.pos"
+        for motor in LEFT_ARM_CONFIG.motors
+    }
+
+
+def test_eva_runs_on_simulated_buses(tmp_path):
+    keyboard = ScriptedInput([{}, {'1': 1, 'a': 2}, {}, {}, {}])
+    stage_timers = StageTimers()
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=keyboard,
+              stage_timers=stage_timers)
+    eva.run()
+    summary = stage_timers.summary()
+    assert summary["keyboard.get_action"]["count"] == 6
+    assert summary["left_arm.move_to_position"]["count"] > 0
+    assert eva.rate_keeper.ticks == 5
+    assert eva.left_arm.get_current_position()[SHOULDER_PAN] > 0
+    assert eva.right_arm.get_current_position()[SHOULDER_PAN] > 0
+    # Right arm and foot share one simulated bus
+    assert len(eva.bus_registry.buses) == 2
+    eva.disconnect()
+
+
+def test_eva_zero_magnitude_moves_nothing(tmp_path):
+    keyboard = ScriptedInput([{'1': 0, 'a': 1}] + [{}] * 5)
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=keyboard)
+    eva.run()
+    assert eva.left_arm.get_current_position()[SHOULDER_PAN] == \
+        pytest.approx(0)
+    assert eva.right_arm.get_current_position()[SHOULDER_PAN] > 0
+    eva.disconnect()
+
+
+def test_eva_jogs_held_keys(tmp_path):
+    keyboard = ScriptedInput([{'1': 1}] * 10 + [{}] * 20)
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=keyboard,
+              jog=True)
+    bus = eva.bus_registry.buses[LEFT_ARM_CONFIG.port].bus
+    goals = []
+    sync_write = bus.sync_write
+
+    def record_write(data_name, values):
+        goals.append(values["shoulder_pan"])
+        sync_write(data_name, values)
+
+    bus.sync_write = record_write
+    eva.run()
+    steps = [b - a for a, b in zip(goals, goals[1:])]
+    # Speeds up while held, then slows down to a stop after the release
+    assert steps[:4] == sorted(steps[:4])
+    assert steps[10:] == sorted(steps[10:], reverse=True)
+    assert steps[-1] == pytest.approx(0)
+    assert not eva.left_arm.jog_velocity.any()
+    eva.disconnect()
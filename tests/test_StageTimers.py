@@ -0,0 +1,37 @@
+import time
+from utils import StageTimer, StageTimers
+
+
+def test_ring_buffer_keeps_last_samples():
+    timer = StageTimer("stage", size=4)
+    for duration in [10, 1, 2, 3, 4]:
+        timer.add(duration)
+    assert timer.count == 5
+    assert timer.max == 10
+    assert sorted(timer.samples) == [1, 2, 3, 4]
+    assert timer.percentiles((50, 99)) == {50: 3, 99: 4}
+
+
+def test_instrument_times_one_object():
+
+    class Bus:
+
+        def sync_read(self):
+            time.sleep(0.001)
+            return 1
+
+    stage_timers = StageTimers()
+    bus, other = Bus(), Bus()
+    stage_timers.instrument(bus, "sync_read")
+    assert bus.sync_read() == 1
+    other.sync_read()
+    summary = stage_timers.summary()["Bus.sync_read"]
+    assert summary["count"] == 1
+    assert summary["p50_ms"] >= 1
+
+
+def test_dump(tmp_path):
+    stage_timers = StageTimers()
+    stage_timers.wrap(lambda: None, "noop")()
+    stage_timers.dump(tmp_path / "timers.json")
+    assert '"noop"' in (tmp_path / "timers.json").read_text()
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from constants import (LEFT_ARM_CONFIG, RIGHT_ARM_CONFIG, FOOT_CONFIG,
+                       SHOULDER_PAN, RobotPosition)
+from Eva import Eva
+from EvaInput import ScriptedInput
+from SimulatedMotorsBus import SimulatedMotorsBus
+from Telemetry import (GOAL, PRESENT, TelemetryRecorder, iter_telemetry,
+                       load_telemetry)
+
+JOINTS = ("a.pos", "b.pos")
+
+
+def test_records_round_trip(tmp_path):
+    recorder = TelemetryRecorder(tmp_path / "session.bin", capacity=16)
+    limb = recorder.add_limb("left", JOINTS)
+    recorder.record(limb, PRESENT, RobotPosition({"a.pos": 1, "b.pos": 2}))
+    recorder.record(limb, GOAL, RobotPosition({"b.pos": 5}))
+    recorder.close()
+
+    telemetry = load_telemetry(tmp_path / "session.bin")
+    assert len(telemetry) == 2
+    assert telemetry.limbs == ["left"]
+    assert telemetry.joints == [list(JOINTS)]
+    times, values = telemetry.select("left", PRESENT)
+    assert values.tolist() == [[1, 2]]
+    times, values = telemetry.select("left", GOAL)
+    assert np.isnan(values[0, 0]) and values[0, 1] == 5
+    assert np.all(np.diff(telemetry.time) >= 0)
+
+
+def test_ring_keeps_latest_records(tmp_path):
+    recorder = TelemetryRecorder(tmp_path / "session.bin", capacity=4)
+    limb = recorder.add_limb("left", JOINTS)
+    for i in range(10):
+        recorder.record(limb, PRESENT, RobotPosition({
+            "a.pos": i,
+            "b.pos": -i
+        }))
+    recorder.close()
+
+    _, values = load_telemetry(tmp_path / "session.bin").select(
+        "left", PRESENT)
+    assert values[:, 0].tolist() == [6, 7, 8, 9]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\0" * 8192)
+    with pytest.raises(ValueError):
+        load_telemetry(path)
+
+
+def test_eva_records_every_limb(tmp_path):
+    keyboard = ScriptedInput([{}, {'1': 1, 'a': 1}, {}, {}])
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=keyboard,
+              telemetry=TelemetryRecorder(tmp_path / "eva.bin"))
+    eva.run()
+    eva.disconnect()
+
+    telemetry = load_telemetry(tmp_path / "eva.bin")
+    assert telemetry.limbs == [
+        LEFT_ARM_CONFIG.id, RIGHT_ARM_CONFIG.id, FOOT_CONFIG.id
+    ]
+    _, goals = telemetry.select(LEFT_ARM_CONFIG.id, GOAL)
+    pan = telemetry.joints[0].index(SHOULDER_PAN)
+    assert goals[:, pan].max() > 0
+    assert len(telemetry.select(RIGHT_ARM_CONFIG.id, PRESENT)[0]) > 0
+
+
+def test_iter_telemetry_streams_in_order(tmp_path):
+    recorder = TelemetryRecorder(tmp_path / "session.bin", capacity=8)
+    limb = recorder.add_limb("left", JOINTS)
+    for i in range(13):
+        recorder.record(limb, GOAL, RobotPosition({"a.pos": i, "b.pos": 0}))
+    recorder.close()
+
+    chunks = list(iter_telemetry(tmp_path / "session.bin", chunk_size=3))
+    values = np.concatenate([chunk["values"][:, 0] for chunk in chunks])
+    assert values.tolist() == list(range(5, 13))
+
+
+def test_replay_reproduces_goals(tmp_path):
+    path = tmp_path / "session.bin"
+    recorder = TelemetryRecorder(path)
+    limb = recorder.add_limb(LEFT_ARM_CONFIG.id, (SHOULDER_PAN, ))
+    for i in range(10):
+        recorder.record(limb, GOAL, RobotPosition({SHOULDER_PAN: i}))
+        recorder.times[i] = i * 0.02
+    recorder.close()
+
+    eva = Eva(LEFT_ARM_CONFIG,
+              RIGHT_ARM_CONFIG,
+              FOOT_CONFIG,
+              bus_factory=SimulatedMotorsBus,
+              calibration_cache_dir=tmp_path,
+              keyboard=ScriptedInput([]))
+    bus = eva.bus_registry.buses[LEFT_ARM_CONFIG.port].bus
+    bus.reset_counters()
+    eva.replay(path, speed=2)
+    # Two goals per tick at twice the speed, one write per tick
+    assert eva.rate_keeper.ticks == 5
+    assert bus.writes == 6
+    assert bus.goal[bus.index["shoulder_pan"]] == 9
+    eva.disconnect()
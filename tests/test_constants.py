@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import constants
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def imported_modules(statement: str) -> set[str]:
+    code = f"{statement}; import sys; print(*sys.modules)"
+    process = subprocess.run([sys.executable, "-c", code],
+                             cwd=ROOT,
+                             capture_output=True,
+                             text=True,
+                             check=True)
+    return {module.split(".")[0] for module in process.stdout.split()}
+
+
+@pytest.mark.parametrize("statement", [
+    "import constants",
+    "from constants import SHOULDER_PAN, RETURN_KEY, EvaRobotConfig",
+    "import main",
+])
+def test_import_skips_lerobot_and_numpy(statement):
+    modules = imported_modules(statement)
+    assert "lerobot" not in modules
+    assert "numpy" not in modules
+
+
+def test_limb_configs_are_built_on_first_use():
+    assert constants.LEFT_ARM_CONFIG.motors["gripper"].id == 6
+    assert constants.FOOT_CONFIG is constants.FOOT_CONFIG
+    assert constants.RobotPosition({"a": 1})["a"] == 1
+    with pytest.raises(AttributeError):
+        constants.LEFT_ARM_PORT
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from kinematics import (L1, L2, forward_kinematics, forward_kinematics_array,
+                        inverse_kinematics, inverse_kinematics_array)
+from trajectory import plan_cartesian_trajectory
+
+
+def test_inverse_kinematics_initial_position():
+    joint2, joint3 = inverse_kinematics(0.1629, 0.1131)
+    assert joint2 == pytest.approx(-0.038, abs=1e-3)
+    assert joint3 == pytest.approx(1.987, abs=1e-3)
+
+
+def test_inverse_kinematics_workspace_boundary():
+    # Targets beyond reach are scaled to the boundary instead of failing
+    assert inverse_kinematics(L1 + L2, 0) == pytest.approx(
+        inverse_kinematics(1.0, 0))
+
+
+def test_inverse_kinematics_array_matches_scalar():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-0.3, 0.3, 200)
+    y = rng.uniform(-0.3, 0.3, 200)
+    joint2, joint3 = inverse_kinematics_array(x, y)
+    expected = np.array([inverse_kinematics(a, b) for a, b in zip(x, y)])
+    np.testing.assert_allclose(joint2, expected[:, 0], atol=1e-9)
+    np.testing.assert_allclose(joint3, expected[:, 1], atol=1e-9)
+
+
+def test_forward_kinematics_inverts_inverse_kinematics():
+    for x, y in [(0.1629, 0.1131), (0.2, 0.05), (0.1, 0.2)]:
+        assert forward_kinematics(*inverse_kinematics(x, y)) == pytest.approx(
+            (x, y))
+    x, y = forward_kinematics_array(*inverse_kinematics_array([0.2, 0.1],
+                                                              [0.05, 0.2]))
+    np.testing.assert_allclose(x, [0.2, 0.1])
+    np.testing.assert_allclose(y, [0.05, 0.2])
+
+
+def test_plan_cartesian_trajectory():
+    trajectory = plan_cartesian_trajectory([(0.16, 0.11), (0.2, 0.11)],
+                                           speed=0.04,
+                                           control_interval=0.1)
+    assert trajectory.duration == pytest.approx(1.0)
+    assert len(trajectory) == 11
+    np.testing.assert_allclose(trajectory.y, 0.11)
+    assert trajectory.sample(10) == pytest.approx(inverse_kinematics(0.2, 0.11))
+    assert plan_cartesian_trajectory([(0.16, 0.11), (0.2, 0.11)],
+                                     speed=0.04,
+                                     control_interval=0.1) is trajectory
@@ -0,0 +1,80 @@
+"""
+Cartesian trajectory planning for the SO100 arm
+
+A straight-line end effector path through waypoints is sampled at the
+control rate and converted to joint space in one vectorized IK call
+before execution, see ArmController.follow. Plans are cached, so repeating
+a move costs nothing.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from kinematics import inverse_kinematics_array
+
+
+@dataclass(frozen=True)
+class JointTrajectory:
+    times: np.ndarray  # Sample times from the start (s)
+    x: np.ndarray  # End effector x per sample
+    y: np.ndarray  # End effector y per sample
+    joint2: np.ndarray  # shoulder_lift per sample (degrees)
+    joint3: np.ndarray  # elbow_flex per sample (degrees)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def sample(self, t: float) -> tuple[float, float]:
+        """Joint targets (joint2, joint3) at time t, held at the ends"""
+        i = int(np.searchsorted(self.times, t, side="right")) - 1
+        i = min(max(i, 0), len(self.times) - 1)
+        return float(self.joint2[i]), float(self.joint3[i])
+
+
+def plan_cartesian_trajectory(waypoints, speed=0.05, control_interval=1.0 / 50):
+    """
+    Plan a constant speed straight-line path through Cartesian waypoints
+
+    Parameters:
+        waypoints: Sequence of (x, y) end effector positions, at least one
+        speed: End effector speed (m/s)
+        control_interval: Time between samples (s)
+
+    Returns:
+        JointTrajectory sampled every control_interval, ending exactly
+        on the last waypoint
+    """
+    waypoints = tuple((float(x), float(y)) for x, y in waypoints)
+    return _plan_cartesian_trajectory(waypoints, float(speed),
+                                      float(control_interval))
+
+
+@lru_cache(maxsize=64)
+def _plan_cartesian_trajectory(waypoints, speed, control_interval):
+    if not waypoints:
+        raise ValueError("At least one waypoint is required")
+    if speed <= 0 or control_interval <= 0:
+        raise ValueError("speed and control_interval must be positive")
+
+    points = np.array(waypoints, dtype=np.float64)
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    # Arrival time at every waypoint
+    arrivals = np.concatenate(([0.0], np.cumsum(lengths) / speed))
+
+    # Ignore rounding errors so an exact multiple does not add a sample
+    steps = int(np.ceil(arrivals[-1] / control_interval - 1e-9))
+    times = np.arange(steps + 1) * control_interval
+    times[-1] = arrivals[-1]
+    x = np.interp(times, arrivals, points[:, 0])
+    y = np.interp(times, arrivals, points[:, 1])
+    joint2, joint3 = inverse_kinematics_array(x, y)
+
+    for array in (times, x, y, joint2, joint3):
+        array.flags.writeable = False
+    return JointTrajectory(times, x, y, joint2, joint3)
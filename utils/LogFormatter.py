@@ -1,4 +1,8 @@
+import copy
 import logging
+import queue
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener
 
 
 class LogFormatter(logging.Formatter):
@@ -17,12 +21,66 @@ class LogFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format + reset
     }
 
+    def __init__(self):
+        super().__init__()
+        # One formatter per level, built once
+        self.formatters = {
+            level: logging.Formatter(log_fmt)
+            for level, log_fmt in self.FORMATS.items()
+        }
+        self.default_formatter = logging.Formatter()
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self.formatters.get(record.levelno,
+                                        self.default_formatter)
         return formatter.format(record)
 
 
+# QueueHandler that leaves the message unformatted, so "%s" arguments are
+# only formatted by the listener thread. Mutable arguments are copied, the
+# caller may change them after the call.
+class LazyQueueHandler(QueueHandler):
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks are formatted while they are still alive
+            return super().prepare(record)
+        record = copy.copy(record)
+        # logging unwraps a single Mapping argument from the args tuple
+        if isinstance(record.args, Mapping):
+            record.args = copy.copy(record.args)
+        elif isinstance(record.args, tuple):
+            record.args = tuple(
+                copy.copy(arg) if isinstance(arg, (Mapping, list, set)) else
+                arg for arg in record.args)
+        return record
+
+
+# Move the logger's handlers behind a queue, terminal I/O then happens on
+# the listener thread instead of the control loop. Call stop() on the
+# returned listener to flush and restore the handlers.
+def start_queued_logging(logger: logging.Logger) -> QueueListener:
+    handlers = list(logger.handlers)
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = LazyQueueHandler(log_queue)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+
+    stop = listener.stop
+
+    def stop_and_restore():
+        logger.removeHandler(queue_handler)
+        stop()
+        for handler in handlers:
+            logger.addHandler(handler)
+
+    listener.stop = stop_and_restore
+    listener.start()
+    return listener
+
+
 def get_custom_logger():
     logger = logging.getLogger("Eva")
     logger.setLevel(logging.DEBUG)
@@ -0,0 +1,90 @@
+import time
+from collections import deque
+
+
+# Keep a loop at a fixed rate by sleeping until absolute deadlines on the
+# monotonic perf_counter clock, so the time spent working does not add to
+# the period. Optionally busy-waits the last busy_wait seconds, time.sleep
+# alone often wakes up late by a fraction of a millisecond.
+class RateKeeper:
+    period: float
+    busy_wait: float
+    ticks: int
+    overruns: int
+
+    def __init__(self,
+                 period: float,
+                 busy_wait: float = 0.0,
+                 history: int = 1000):
+        self.period = period
+        self.busy_wait = busy_wait
+        self.periods = deque(maxlen=history)
+        self.start()
+
+    # Reset the statistics and start counting deadlines from now
+    def start(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.periods.clear()
+        self.start_time = time.perf_counter()
+        self.last_tick = self.start_time
+        self.deadline = self.start_time
+
+    # Wait for the next deadline. Return False if the deadline was missed,
+    # in that case the schedule restarts from now instead of catching up
+    def wait(self) -> bool:
+        remaining = self._next_deadline()
+        if remaining is not None:
+            if remaining > self.busy_wait:
+                time.sleep(remaining - self.busy_wait)
+            while time.perf_counter() < self.deadline:
+                pass
+        return self._tick(remaining is not None)
+
+    # wait() for asyncio tasks, other tasks run while it sleeps. There is no
+    # busy wait, it would hold up the event loop
+    async def wait_async(self) -> bool:
+        import asyncio
+        remaining = self._next_deadline()
+        if remaining is not None:
+            await asyncio.sleep(remaining)
+        return self._tick(remaining is not None)
+
+    # Seconds until the next deadline, None if it was missed
+    def _next_deadline(self) -> float:
+        self.deadline += self.period
+        now = time.perf_counter()
+        remaining = self.deadline - now
+        if remaining < 0:
+            self.overruns += 1
+            self.deadline = now
+            return None
+        return remaining
+
+    def _tick(self, on_time: bool) -> bool:
+        now = time.perf_counter()
+        self.periods.append(now - self.last_tick)
+        self.last_tick = now
+        self.ticks += 1
+        return on_time
+
+    @property
+    def achieved_hz(self) -> float:
+        elapsed = self.last_tick - self.start_time
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    # Percentiles of |period - expected period| over the recent ticks
+    def jitter_percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        jitter = sorted(abs(p - self.period) for p in self.periods)
+        if not jitter:
+            return {p: 0.0 for p in percentiles}
+        return {
+            p: jitter[min(len(jitter) - 1, round(p / 100 * (len(jitter) - 1)))]
+            for p in percentiles
+        }
+
+    def __str__(self):
+        jitter = " ".join(f"p{p}={v * 1000:.2f}ms"
+                          for p, v in self.jitter_percentiles().items())
+        return (f"ticks={self.ticks} overruns={self.overruns} "
+                f"rate={self.achieved_hz:.1f}Hz jitter {jitter}")
@@ -0,0 +1,111 @@
+import functools
+import json
+import time
+from array import array
+from pathlib import Path
+
+
+# Durations of one stage in a fixed-size ring buffer
+class StageTimer:
+    name: str
+    count: int
+    total: float
+
+    def __init__(self, name: str, size: int = 1024):
+        self.name = name
+        self.size = size
+        self.samples = array('d', bytes(8 * size))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float):
+        self.samples[self.count % self.size] = duration
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    # Percentiles over the samples still in the ring buffer
+    def percentiles(self, percentiles=(50, 90, 99)) -> dict:
+        samples = sorted(self.samples[:min(self.count, self.size)])
+        if not samples:
+            return {p: 0.0 for p in percentiles}
+        return {
+            p: samples[min(len(samples) - 1, round(p / 100 *
+                                                    (len(samples) - 1)))]
+            for p in percentiles
+        }
+
+    def summary(self) -> dict:
+        summary = {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+        }
+        for p, value in self.percentiles().items():
+            summary[f"p{p}_ms"] = value * 1000
+        return summary
+
+
+# Per-stage timers for the control path.
+# Nothing is timed until a function is wrapped with wrap() or instrument(),
+# so code that is not instrumented pays nothing.
+class StageTimers:
+    timers: dict[str, StageTimer]
+
+    def __init__(self, summary_interval: float = 10.0, size: int = 1024):
+        self.timers = {}
+        self.size = size
+        self.summary_interval = summary_interval
+        self.last_summary = time.perf_counter()
+
+    def get(self, stage: str) -> StageTimer:
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = self.timers[stage] = StageTimer(stage, self.size)
+        return timer
+
+    def wrap(self, func, stage: str):
+        add = self.get(stage).add
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(perf_counter() - start)
+
+        return timed
+
+    # Replace obj.name with a timed version, on this object only
+    def instrument(self, obj, name: str, stage: str = None):
+        stage = stage if stage else f"{type(obj).__name__}.{name}"
+        setattr(obj, name, self.wrap(getattr(obj, name), stage))
+
+    def summary(self) -> dict:
+        return {
+            stage: timer.summary()
+            for stage, timer in self.timers.items()
+        }
+
+    def __str__(self):
+        lines = [
+            f"{stage}: n={s['count']} mean={s['mean_ms']:.2f}ms "
+            f"p50={s['p50_ms']:.2f}ms p99={s['p99_ms']:.2f}ms "
+            f"max={s['max_ms']:.2f}ms"
+            for stage, s in self.summary().items()
+        ]
+        return "\n" + "\n".join(lines) + "\n"
+
+    # Log the summary every summary_interval seconds
+    def log_summary_if_due(self, logger):
+        now = time.perf_counter()
+        if now - self.last_summary >= self.summary_interval:
+            self.last_summary = now
+            logger.info("Stage timers: %s", self)
+
+    def dump(self, path: Path):
+        Path(path).write_text(json.dumps(self.summary(), indent=2))
@@ -1,3 +1,9 @@
-from .LogFormatter import get_custom_logger, LogFormatter
+from .LogFormatter import (get_custom_logger, LogFormatter, LazyQueueHandler,
+                           start_queued_logging)
+from .RateKeeper import RateKeeper
+from .StageTimers import StageTimer, StageTimers
 
-__all__ = ['get_custom_logger', 'LogFormatter']
+__all__ = [
+    'get_custom_logger', 'LogFormatter', 'LazyQueueHandler',
+    'start_queued_logging', 'RateKeeper', 'StageTimer', 'StageTimers'
+]